@@ -0,0 +1,298 @@
+# SRP - Log structured persistance
+# PersistanceManager.save_to_file rewrites the whole journal on every save, and Journal.remove_entry
+# deletes from the middle of a list.
+# Here the responsabilities are still separated:
+#   - Journal only keeps the entries (a dict, so removing is O(1)) and the list of changes since the last save
+#   - JournalLog only knows how to persist: every change is appended to a log file (+n:text, -n for deletions),
+#     the file is fsync'ed in batches and compacted (tombstones dropped) in a background thread
+#   - LogPersistanceManager moves the pending changes from a journal to a log
+# Saving a journal after adding one entry writes one line, whatever the size of the journal.
+# After a crash the last record may be half written (it was not fsync'ed yet): load() ignores it and
+# opening the log cuts it off, so the next record does not get glued to it.
+
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+
+class Journal:
+    def __init__(self):
+        self.entries = {}
+        self.count = 0
+        self.changes = []  # (number, text) since last save, text is None for removed entries
+
+    def add_entry(self, text):
+        self.count += 1
+        self.entries[self.count] = text
+        self.changes.append((self.count, text))
+
+    def remove_entry(self, number):
+        del self.entries[number]
+        self.changes.append((number, None))
+
+    def __str__(self):
+        return '\n'.join(f'{n}: {text}' for n, text in self.entries.items())
+
+
+class JournalLog:
+    def __init__(self, filename, batch_size=1000):
+        self.filename = filename
+        self.batch_size = batch_size  # records written between two fsyncs
+        self.unsynced = 0
+        self.lock = threading.Lock()
+        self.compactor = None
+        self._drop_torn_record()
+        self.file = open(filename, 'ab')
+
+    def _drop_torn_record(self):
+        # every record ends with a newline, whatever follows the last one is a record the crash cut, and a
+        # last record that does not parse is dropped too before anything is appended after it
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+            return
+        with open(self.filename, 'r+b') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = data.rfind(b'\n') + 1
+                if end:
+                    start = data.rfind(b'\n', 0, end - 1) + 1
+                    try:
+                        self._apply(data[start:end - 1], Journal())
+                    except ValueError:
+                        end = start
+                cut = end < len(data)
+            if cut:
+                f.truncate(end)
+
+    @staticmethod
+    def _escape(text):
+        return text.encode('unicode_escape')
+
+    def append(self, number, text):
+        self._write(b'+%d:%s\n' % (number, self._escape(text)))
+
+    def tombstone(self, number):
+        self._write(b'-%d\n' % number)
+
+    def _write(self, record):
+        with self.lock:
+            self.file.write(record)
+            self.unsynced += 1
+            if self.unsynced >= self.batch_size:
+                self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def flush(self):
+        # hand the buffered records to the OS, fsync stays batched
+        with self.lock:
+            self.file.flush()
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    @staticmethod
+    def _apply(record, journal):
+        kind, body = record[:1], record[1:]
+        if kind == b'+':
+            number, text = body.split(b':', 1)
+            number = int(number)
+            journal.entries[number] = text.decode('unicode_escape')
+            journal.count = max(journal.count, number)
+        elif kind == b'-':
+            journal.entries.pop(int(body), None)
+        elif kind == b'=':
+            journal.count = max(journal.count, int(body))
+
+    @staticmethod
+    def _replay(data, journal):
+        # returns the offset after the last record replayed, a partial or unparsable last record is skipped
+        end = 0
+        for line in iter(data.readline, b''):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError(f'partial record {line!r}')
+                JournalLog._apply(line[:-1], journal)
+            except ValueError as e:
+                if data.tell() < len(data):
+                    raise ValueError(f'corrupt record at offset {end}: {line!r}') from e
+                break
+            end = data.tell()
+        return end
+
+    def _load(self, limit=None):
+        self.flush()
+        journal = Journal()
+        size = os.path.getsize(self.filename) if limit is None else limit
+        if size == 0:
+            return journal, 0
+        with open(self.filename, 'rb') as f, \
+                mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as data:
+            return journal, self._replay(data, journal)
+
+    def load(self, limit=None):
+        # Rebuild a journal reading the log through a memory map (up to limit bytes)
+        return self._load(limit)[0]
+
+    def compact(self):
+        # Rewrite the log with only the live entries, appends can carry on meanwhile
+        with self.lock:
+            self.file.flush()
+            offset = self.file.tell()
+        # a record that could not be replayed is not copied forward, only what was appended after offset
+        journal, _ = self._load(offset)
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)))
+        with os.fdopen(fd, 'wb') as out:
+            out.write(b'=%d\n' % journal.count)
+            for number, text in journal.entries.items():
+                out.write(b'+%d:%s\n' % (number, self._escape(text)))
+
+            with self.lock:
+                # copy whatever was appended while we were compacting, then swap the files
+                self.file.flush()
+                with open(self.filename, 'rb') as f:
+                    f.seek(offset)
+                    shutil.copyfileobj(f, out)
+                out.flush()
+                os.fsync(out.fileno())
+                self.file.close()
+                os.replace(tmp, self.filename)
+                self.file = open(self.filename, 'ab')
+                self.unsynced = 0
+
+    def compact_in_background(self):
+        if self.compactor is None or not self.compactor.is_alive():
+            self.compactor = threading.Thread(target=self.compact, daemon=True)
+            self.compactor.start()
+        return self.compactor
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor.join()
+        self.sync()
+        self.file.close()
+
+
+class LogPersistanceManager:
+    @staticmethod
+    def save(journal, log):
+        for number, text in journal.changes:
+            if text is None:
+                log.tombstone(number)
+            else:
+                log.append(number, text)
+        journal.changes.clear()
+        log.flush()
+
+
+class TornLogTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'journal.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def crashed_log(self, data):
+        with open(self.filename, 'wb') as f:
+            f.write(data)
+
+    def test_partial_text(self):
+        self.crashed_log(b'+1:hello\n+2:wor')
+        log = JournalLog(self.filename)
+        self.assertEqual(log.load().entries, {1: 'hello'})
+        log.append(2, 'world')
+        self.assertEqual(log.load().entries, {1: 'hello', 2: 'world'})
+        log.close()
+
+    def test_partial_number(self):
+        self.crashed_log(b'+1:hello\n+2')
+        log = JournalLog(self.filename)
+        self.assertEqual(log.load().entries, {1: 'hello'})
+        log.close()
+
+    def test_load_skips_partial_record(self):
+        log = JournalLog(self.filename)
+        # the crash happens once the log is open
+        with open(self.filename, 'ab') as f:
+            f.write(b'+1:hello\n+2:wor')
+        self.assertEqual(log.load().entries, {1: 'hello'})
+        log.close()
+
+    def test_unparsable_last_record(self):
+        self.crashed_log(b'+1:hello\n+2\n')
+        log = JournalLog(self.filename)
+        log.append(3, 'again')
+        self.assertEqual(log.load().entries, {1: 'hello', 3: 'again'})
+        log.close()
+
+    def test_compact_drops_partial_record(self):
+        self.crashed_log(b'+1:hello\n+2:wor')
+        log = JournalLog(self.filename)
+        log.append(3, 'again')
+        log.compact()
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), b'=3\n+1:hello\n+3:again\n')
+        log.close()
+
+
+if __name__ == '__main__':
+    # python srp_log_store.py test
+    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+        unittest.main(argv=sys.argv[:1])
+
+    folder = tempfile.mkdtemp()
+    log = JournalLog(os.path.join(folder, 'journal.log'))
+
+    j = Journal()
+    j.add_entry('I cried today.')
+    j.add_entry('I ate a bug.')
+    j.add_entry('I ate another bug.')
+    j.remove_entry(3)
+    LogPersistanceManager.save(j, log)
+    log.compact_in_background().join()
+    print(f'Journal entries (reloaded):\n{log.load()}')
+    log.close()
+
+    # Benchmark: python srp_log_store.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    j = Journal()
+    for i in range(n):
+        j.add_entry(f'entry number {i}')
+    log = JournalLog(os.path.join(folder, 'big.log'))
+    LogPersistanceManager.save(j, log)
+
+    j.add_entry('one more entry')
+    start = time.perf_counter()
+    LogPersistanceManager.save(j, log)
+    log_time = time.perf_counter() - start
+
+    # what PersistanceManager.save_to_file does
+    start = time.perf_counter()
+    with open(os.path.join(folder, 'big.txt'), 'w') as f:
+        f.write(str(j))
+    rewrite_time = time.perf_counter() - start
+    print(f'Saving one new entry in a {n} entries journal: '
+          f'log {log_time * 1000:.3f}ms, full rewrite {rewrite_time * 1000:.3f}ms')
+
+    start = time.perf_counter()
+    loaded = log.load()
+    print(f'Loaded {len(loaded.entries)} entries in {time.perf_counter() - start:.3f}s')
+
+    for number in range(1, n, 2):
+        j.remove_entry(number)
+    LogPersistanceManager.save(j, log)
+    start = time.perf_counter()
+    log.compact()
+    print(f'Compacted to {os.path.getsize(log.filename)} bytes in {time.perf_counter() - start:.3f}s')
+    assert log.load().entries == j.entries
+    log.close()
+    shutil.rmtree(folder)
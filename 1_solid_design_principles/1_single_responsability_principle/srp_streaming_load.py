@@ -0,0 +1,152 @@
+# SRP - Streaming loaders
+# srp.py only has save_to_file, the load and load_from_web methods were left as stubs.
+# Loading is one more persistance responsability, so it goes into its own class, not into the Journal.
+# Both loaders are generators yielding (count, text) one entry at a time, so memory stays bounded
+# whatever the size of the journal:
+#   - load reads a local file through a memory map, releasing the pages it already parsed
+#   - load_from_web iterates over the lines of the http response as they arrive
+# They parse the '{count}: {text}' format written by PersistanceManager.save_to_file, a line that does
+# not start with a count belongs to the previous entry (the text had a new line in it).
+
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import mmap
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+
+class Journal:
+    def __init__(self):
+        self.entries = []
+        self.count = 0
+
+    def add_entry(self, text):
+        self.count += 1
+        self.entries.append(f'{self.count}: {text}')
+
+    def remove_entry(self, pos):
+        del self.entries[pos]
+
+    def __str__(self):
+        return '\n'.join(self.entries)
+
+
+class JournalLoader:
+    release_every = 64 * 1024 * 1024  # bytes parsed before giving the pages back to the OS
+
+    @staticmethod
+    def parse(lines):
+        count = text = None
+        for line in lines:
+            line = line.rstrip(b'\r\n')
+            number, sep, body = line.partition(b': ')
+            if sep and number.isdigit():
+                if count is not None:
+                    yield count, text
+                count, text = int(number), body.decode('utf-8')
+            elif count is not None:
+                text += '\n' + line.decode('utf-8')
+        if count is not None:
+            yield count, text
+
+    @staticmethod
+    def _mapped_lines(filename):
+        with open(filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                released = 0
+                for line in iter(data.readline, b''):
+                    yield line
+                    parsed = data.tell() - released
+                    if parsed >= JournalLoader.release_every:
+                        end = released + parsed - parsed % mmap.PAGESIZE
+                        data.madvise(mmap.MADV_DONTNEED, released, end - released)
+                        released = end
+
+    @staticmethod
+    def load(filename):
+        return JournalLoader.parse(JournalLoader._mapped_lines(filename))
+
+    @staticmethod
+    def load_from_web(uri):
+        with urllib.request.urlopen(uri) as response:
+            yield from JournalLoader.parse(response)
+
+    @staticmethod
+    def to_journal(entries):
+        journal = Journal()
+        for count, text in entries:
+            journal.entries.append(f'{count}: {text}')
+            journal.count = max(journal.count, count)
+        return journal
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_folder(folder):
+    # Local stand-in for the web, serves the files of a folder over http
+    handler = partial(QuietHandler, directory=folder)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(name, entries):
+    count = 0
+    start = time.perf_counter()
+    for _ in entries:
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f'  {name:<14} {count} entries, {count / elapsed:,.0f} entries/s, peak RSS {peak_rss_mb():.0f}MB')
+
+
+if __name__ == '__main__':
+    folder = tempfile.mkdtemp()
+    server = serve_folder(folder)
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    j = Journal()
+    j.add_entry('I cried today.')
+    j.add_entry('I ate a bug.\nIt was crunchy.')
+    with open(os.path.join(folder, 'journal.txt'), 'w') as f:
+        f.write(str(j))
+
+    print(f'From file:\n{JournalLoader.to_journal(JournalLoader.load(os.path.join(folder, "journal.txt")))}')
+    print(f'From web:\n{JournalLoader.to_journal(JournalLoader.load_from_web(url + "/journal.txt"))}')
+
+    # Benchmark: python srp_streaming_load.py <size in MB>
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 4 * 1024 * 1024 * 1024
+    filename = os.path.join(folder, 'big.txt')
+    with open(filename, 'wb') as f:
+        count = written = 0
+        block = []
+        while written < size:
+            count += 1
+            line = b'%d: Today I wrote entry number %d of a very long journal\n' % (count, count)
+            block.append(line)
+            written += len(line)
+            if len(block) == 100_000:
+                f.write(b''.join(block))
+                block.clear()
+        f.write(b''.join(block))
+
+    print(f'Journal of {written / 1024 / 1024:.0f}MB, peak RSS before loading {peak_rss_mb():.0f}MB')
+    benchmark('load', JournalLoader.load(filename))
+    benchmark('load_from_web', JournalLoader.load_from_web(url + '/big.txt'))
+
+    server.shutdown()
+    shutil.rmtree(folder)
@@ -0,0 +1,190 @@
+# OCP - Columnar product store
+# ProductFilter and BetterFilter yield one python object at a time. For batch jobs we can store the products
+# by column instead: names in a list, and color + size packed in one byte per row (color << 4 | size).
+# A specification is then evaluated over the whole column at once as a boolean mask (one byte per row):
+#   - there are only len(Color) * len(Size) possible codes, so any tree of Color/Size/And/Or/Not specs
+#     can be evaluated once per code, giving a 256 entry truth table
+#   - bytes.translate with that table turns the code column into the mask in a single C pass
+#   - index arrays come from per-code posting lists (built once), so no row is visited at query time
+# Only custom specifications (that may look at other fields) are evaluated row by row.
+
+from array import array
+from itertools import chain, compress
+import random
+import sys
+import time
+
+from ocp import (
+    Color, Size, Product, ProductFilter,
+    ColorSpecification, SizeSpecification, AndSpecification
+)
+from ocp_compiled_spec import OrSpecification, NotSpecification
+
+def encode(color, size):
+    return color.value << 4 | size.value
+
+
+class ProductRow:
+    # Lazy view over one row of the store, it looks like a Product
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def name(self):
+        return self.store.names[self.row]
+
+    @property
+    def color(self):
+        return Color(self.store.codes[self.row] >> 4)
+
+    @property
+    def size(self):
+        return Size(self.store.codes[self.row] & 0xF)
+
+    def to_product(self):
+        return Product(self.name, self.color, self.size)
+
+
+class ColumnarProductStore:
+    # Specifications that only look at color and size, they can be turned into a truth table
+    table_specs = (
+        ColorSpecification, SizeSpecification,
+        AndSpecification, OrSpecification, NotSpecification
+    )
+
+    def __init__(self, products=()):
+        self.names = []
+        self.codes = bytearray()
+        self._postings = None
+        self.extend(products)
+
+    def extend(self, products):
+        for p in products:
+            self.names.append(p.name)
+            self.codes.append(encode(p.color, p.size))
+        self._postings = None
+
+    @property
+    def postings(self):
+        # code -> sorted array of the rows having that code
+        if self._postings is None:
+            postings = {}
+            for row, code in enumerate(self.codes):
+                if code not in postings:
+                    postings[code] = array('I')
+                postings[code].append(row)
+            self._postings = postings
+        return self._postings
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, row):
+        return ProductRow(self, row)
+
+    def _is_table_spec(self, spec):
+        if not isinstance(spec, self.table_specs):
+            return False
+        children = getattr(spec, 'args', None) or \
+            ([spec.spec] if isinstance(spec, NotSpecification) else [])
+        return all(self._is_table_spec(s) for s in children)
+
+    def truth_table(self, spec):
+        table = bytearray(256)
+        for color in Color:
+            for size in Size:
+                if spec.is_satisfied(Product('', color, size)):
+                    table[encode(color, size)] = 1
+        return bytes(table)
+
+    def mask(self, spec):
+        # One byte per row, 1 if the row satisfies the spec
+        if self._is_table_spec(spec):
+            return self.codes.translate(self.truth_table(spec))
+        # custom specification, evaluated row by row
+        return bytes(bool(spec.is_satisfied(row)) for row in self.rows())
+
+    def count(self, spec):
+        if not self._is_table_spec(spec):
+            return self.mask(spec).count(1)
+        table = self.truth_table(spec)
+        return sum(len(rows) for code, rows in self.postings.items() if table[code])
+
+    def rows(self):
+        for row in range(len(self)):
+            yield ProductRow(self, row)
+
+    def indexes(self, spec):
+        if not self._is_table_spec(spec):
+            return array('I', compress(range(len(self)), self.mask(spec)))
+        table = self.truth_table(spec)
+        lists = [rows for code, rows in self.postings.items() if table[code]]
+        if not lists:
+            return array('I')
+        if len(lists) == 1:
+            return lists[0][:]
+        return array('I', sorted(chain.from_iterable(lists)))
+
+    def filter(self, spec):
+        # Same results as BetterFilter but as lazy row views
+        for row in self.indexes(spec):
+            yield ProductRow(self, row)
+
+
+if __name__ == '__main__':
+    apple = Product('Apple', Color.GREEN, Size.SMALL)
+    tree = Product('Tree', Color.GREEN, Size.LARGE)
+    house = Product('House', Color.BLUE, Size.LARGE)
+
+    store = ColumnarProductStore([apple, tree, house])
+    print('Green products (columnar):')
+    for p in store.filter(ColorSpecification(Color.GREEN)):
+        print(f'  - {p.name} is green')
+
+    # Benchmark: python ocp_columnar.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    colors = list(Color)
+    sizes = list(Size)
+    products = [
+        Product(f'product-{i}', random.choice(colors), random.choice(sizes))
+        for i in range(n)
+    ]
+    start = time.perf_counter()
+    store = ColumnarProductStore(products)
+    store.postings
+    print(f'Columnar store built in {time.perf_counter() - start:.3f}s')
+    pf = ProductFilter()
+
+    # sweep every color/size combination, checking against the generator based path
+    generator_time = mask_time = count_time = index_time = 0
+    for color in colors:
+        for size in sizes:
+            spec = AndSpecification(ColorSpecification(color), SizeSpecification(size))
+
+            start = time.perf_counter()
+            old = list(pf.filter_by_color_and_size(products, color, size))
+            generator_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            mask = store.mask(spec)
+            mask_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            matches = store.count(spec)
+            count_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = store.indexes(spec)
+            index_time += time.perf_counter() - start
+
+            assert mask.count(1) == matches == len(old)
+            assert [products[i] for i in rows] == old
+
+    queries = len(colors) * len(sizes)
+    print(f'{n} rows, {queries} queries: generator {generator_time:.3f}s')
+    print(f'  columnar mask    {mask_time:.3f}s (x{generator_time / mask_time:.1f})')
+    print(f'  columnar count   {count_time:.3f}s (x{generator_time / count_time:.1f})')
+    print(f'  columnar indexes {index_time:.3f}s (x{generator_time / index_time:.1f})')
@@ -0,0 +1,172 @@
+# OCP - Compiled specifications
+# AndSpecification.is_satisfied builds a lambda, goes through map and all and makes one method call per child
+# for every single item, that costs more than the equality checks themselves.
+# Here we walk the specification tree once and turn it into one flat python expression, e.g.
+#   (item.size == _v0 and item.color == _v1)
+# which gets compiled into a single function. The result is still a Specification, so BetterFilter
+# (or any other Filter) works with it without any change.
+# We also add the Or / Not specifications by extension, the original classes are untouched.
+
+import random
+import sys
+import time
+
+from ocp import (
+    Color, Size, Product, Specification, BetterFilter,
+    ColorSpecification, SizeSpecification, AndSpecification
+)
+
+
+class OrSpecification(Specification):
+    def __init__(self, *args):
+        self.args = args
+
+    def is_satisfied(self, item):
+        return any(spec.is_satisfied(item) for spec in self.args)
+
+
+class NotSpecification(Specification):
+    def __init__(self, spec):
+        self.spec = spec
+
+    def is_satisfied(self, item):
+        return not self.spec.is_satisfied(item)
+
+
+class CompiledSpecification(Specification):
+    def __init__(self, spec, predicate, source):
+        self.spec = spec
+        self.source = source
+        # the instance attribute shadows the method, so filters call the fused predicate directly
+        self.is_satisfied = predicate
+
+    def __str__(self):
+        return self.source
+
+
+class SpecificationCompiler:
+    # Estimates how many items pass each spec (0..1) so And/Or can short-circuit as early as possible:
+    # And runs its most selective child first, Or runs its least selective child first.
+    # If a sample of items is given the estimate is measured on it, otherwise we assume enum values
+    # are evenly distributed (and that a custom spec lets half of them through).
+    # The cost comes before the estimate: a child with a custom spec inside is a function call, it runs
+    # after the plain comparisons in an And as well as in an Or.
+    def __init__(self, sample=None):
+        self.sample = list(sample) if sample is not None else None
+
+    def selectivity(self, spec):
+        if self.sample:
+            return sum(1 for item in self.sample if spec.is_satisfied(item)) / len(self.sample)
+        if isinstance(spec, ColorSpecification):
+            return 1 / len(Color)
+        if isinstance(spec, SizeSpecification):
+            return 1 / len(Size)
+        if isinstance(spec, AndSpecification):
+            result = 1.0
+            for s in spec.args:
+                result *= self.selectivity(s)
+            return result
+        if isinstance(spec, OrSpecification):
+            miss = 1.0
+            for s in spec.args:
+                miss *= 1 - self.selectivity(s)
+            return 1 - miss
+        if isinstance(spec, NotSpecification):
+            return 1 - self.selectivity(spec.spec)
+        # unknown custom spec
+        return 0.5
+
+    def _opaque(self, spec):
+        # True when the tree contains a specification we cannot look into
+        if isinstance(spec, (ColorSpecification, SizeSpecification)):
+            return False
+        if isinstance(spec, (AndSpecification, OrSpecification)):
+            return any(self._opaque(s) for s in spec.args)
+        if isinstance(spec, NotSpecification):
+            return self._opaque(spec.spec)
+        return True
+
+    def compile(self, spec):
+        if isinstance(spec, CompiledSpecification):
+            return spec
+        constants = {}
+        source = self._expression(spec, constants)
+        code = f'def predicate(item):\n    return {source}\n'
+        namespace = dict(constants)
+        exec(code, namespace)
+        return CompiledSpecification(spec, namespace['predicate'], source)
+
+    def _constant(self, value, constants):
+        name = f'_v{len(constants)}'
+        constants[name] = value
+        return name
+
+    def _expression(self, spec, constants):
+        if isinstance(spec, ColorSpecification):
+            return f'item.color == {self._constant(spec.color, constants)}'
+        if isinstance(spec, SizeSpecification):
+            return f'item.size == {self._constant(spec.size, constants)}'
+        if isinstance(spec, AndSpecification):
+            if not spec.args:
+                return 'True'
+            children = sorted(spec.args, key=lambda s: (self._opaque(s), self.selectivity(s)))
+            return '(' + ' and '.join(self._expression(s, constants) for s in children) + ')'
+        if isinstance(spec, OrSpecification):
+            if not spec.args:
+                return 'False'
+            children = sorted(spec.args, key=lambda s: (self._opaque(s), -self.selectivity(s)))
+            return '(' + ' or '.join(self._expression(s, constants) for s in children) + ')'
+        if isinstance(spec, NotSpecification):
+            return f'(not {self._expression(spec.spec, constants)})'
+        # custom specification: call its bound method, we cannot look inside it
+        return f'{self._constant(spec.is_satisfied, constants)}(item)'
+
+
+def compile_spec(spec, sample=None):
+    return SpecificationCompiler(sample).compile(spec)
+
+
+if __name__ == '__main__':
+    apple = Product('Apple', Color.GREEN, Size.SMALL)
+    tree = Product('Tree', Color.GREEN, Size.LARGE)
+    house = Product('House', Color.BLUE, Size.LARGE)
+
+    products = [apple, tree, house]
+    bf = BetterFilter()
+
+    green_or_small_not_large = OrSpecification(
+        ColorSpecification(Color.GREEN),
+        AndSpecification(
+            SizeSpecification(Size.SMALL),
+            NotSpecification(SizeSpecification(Size.LARGE))
+        )
+    )
+    compiled = compile_spec(green_or_small_not_large)
+    print(f'Compiled: {compiled}')
+    for p in bf.filter(products, compiled):
+        print(f'  - {p.name}')
+
+    # Benchmark: python ocp_compiled_spec.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    many = [
+        Product(f'product-{i}', random.choice(list(Color)), random.choice(list(Size)))
+        for i in range(n)
+    ]
+    spec = AndSpecification(
+        ColorSpecification(Color.BLUE),
+        SizeSpecification(Size.LARGE),
+        NotSpecification(ColorSpecification(Color.RED))
+    )
+    compiled = compile_spec(spec, sample=many[:1000])
+
+    start = time.perf_counter()
+    tree_result = list(bf.filter(many, spec))
+    tree_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_result = list(bf.filter(many, compiled))
+    compiled_time = time.perf_counter() - start
+
+    assert tree_result == compiled_result
+    print(f'{n} products: tree {tree_time:.3f}s, compiled {compiled_time:.3f}s '
+          f'(x{tree_time / compiled_time:.1f})')
@@ -0,0 +1,119 @@
+# OCP - Parallel filter
+# BetterFilter runs on a single core. ParallelFilter is one more Filter: it splits the products in shards
+# and evaluates the specification on each shard in a separate process.
+# Each worker only sends back the positions of the matches inside its shard, the parent process then
+# yields its own product objects, so the results are not pickled twice.
+# Both the products and the specification travel to the workers, so they must be picklable
+# (the Specification classes in ocp.py are, a compiled specification is not).
+# The worker processes are started once, on the first query, and reused by the next ones; close() (or
+# leaving a with block) shuts them down. An executor can also be passed in, then its owner shuts it down.
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import random
+import sys
+import time
+
+from ocp import (
+    Color, Size, Product, Filter, BetterFilter,
+    ColorSpecification, SizeSpecification, AndSpecification
+)
+
+
+def _match_shard(start, shard, spec):
+    return start, [i for i, item in enumerate(shard) if spec.is_satisfied(item)]
+
+
+class ParallelFilter(Filter):
+    def __init__(self, workers=None, chunk_size=10_000, ordered=True, executor=None):
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.executor = executor
+        self.owns_executor = executor is None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.owns_executor and self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def shards(self, items):
+        for start in range(0, len(items), self.chunk_size):
+            yield start, items[start:start + self.chunk_size]
+
+    def filter(self, items, spec):
+        items = items if isinstance(items, (list, tuple)) else list(items)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        futures = []
+        try:
+            futures.extend(
+                self.executor.submit(_match_shard, start, shard, spec)
+                for start, shard in self.shards(items)
+            )
+            # in order: wait for each shard in turn, otherwise: first finished first served
+            done = futures if self.ordered else as_completed(futures)
+            for future in done:
+                start, matches = future.result()
+                for i in matches:
+                    yield items[start + i]
+        finally:
+            # the consumer may stop early, the shards nobody is waiting for are dropped
+            for future in futures:
+                future.cancel()
+
+
+def benchmark(n, max_workers, chunk_size):
+    products = [
+        Product(f'product-{i}', random.choice(list(Color)), random.choice(list(Size)))
+        for i in range(n)
+    ]
+    spec = AndSpecification(
+        SizeSpecification(Size.LARGE),
+        ColorSpecification(Color.BLUE)
+    )
+
+    start = time.perf_counter()
+    expected = list(BetterFilter().filter(products, spec))
+    baseline = time.perf_counter() - start
+    print(f'{n} products, chunk size {chunk_size}')
+    print(f'  BetterFilter       {baseline:.3f}s')
+
+    # powers of two, and max_workers itself
+    counts = [1 << i for i in range(max_workers.bit_length()) if 1 << i < max_workers] + [max_workers]
+    for workers in counts:
+        with ParallelFilter(workers=workers, chunk_size=chunk_size) as pf:
+            start = time.perf_counter()
+            result = list(pf.filter(products, spec))
+            first = time.perf_counter() - start
+            assert result == expected
+            # the workers are already running for the next query
+            start = time.perf_counter()
+            list(pf.filter(products, spec))
+            elapsed = time.perf_counter() - start
+        print(f'  ParallelFilter x{workers:<3} {elapsed:.3f}s (speedup x{baseline / elapsed:.2f}), '
+              f'first query {first:.3f}s')
+
+
+if __name__ == '__main__':
+    apple = Product('Apple', Color.GREEN, Size.SMALL)
+    tree = Product('Tree', Color.GREEN, Size.LARGE)
+    house = Product('House', Color.BLUE, Size.LARGE)
+
+    with ParallelFilter(workers=2, chunk_size=1) as pf:
+        print('Green products (parallel):')
+        for p in pf.filter([apple, tree, house], ColorSpecification(Color.GREEN)):
+            print(f'  - {p.name} is green')
+
+    # Scaling benchmark: python ocp_parallel.py <products> <max workers> <chunk size>
+    # The specifications are cheap, so past a few workers the cost of pickling the shards wins
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else 50_000
+    benchmark(n, max_workers, chunk_size)
@@ -0,0 +1,155 @@
+# DIP - Adjacency relationships
+# Because Research only depends on the RelationshipBrowser abstraction, we can swap the low level module
+# without touching it. Relationships scans the whole relations list on every lookup,
+# AdjacencyRelationships keeps one index per relationship type: relationship -> person -> related people,
+# so a lookup only touches the people actually related (O(degree)).
+# Multi-hop queries (grandchildren, descendants up to depth k) are breadth-first generators over the index.
+
+from abc import abstractmethod
+from collections import deque
+from enum import Enum
+import random
+import sys
+import time
+
+
+class Relationship(Enum):
+    PARENT = 0
+    CHILD = 1
+    SIBLING = 2
+
+class Person:
+    def __init__(self, name):
+        self.name = name
+
+class RelationshipBrowser:
+    @abstractmethod
+    def find_all_children_of(self, name):
+        pass
+
+class Relationships(RelationshipBrowser):  # Low level module, list scan
+    def __init__(self):
+        self.relations = []
+
+    def add_parent_and_child(self, parent, child):
+        self.relations.append(
+            (parent, Relationship.PARENT, child)
+        )
+        self.relations.append(
+            (child, Relationship.CHILD, parent)
+        )
+
+    def find_all_children_of(self, name):
+        for r in self.relations:
+            if r[0].name == name and r[1] == Relationship.PARENT:
+                yield r[2].name
+
+class AdjacencyRelationships(RelationshipBrowser):  # Low level module, indexed
+    def __init__(self):
+        self.index = {r: {} for r in Relationship}
+
+    def _link(self, relationship, a, b):
+        related = self.index[relationship]
+        if a in related:
+            related[a].append(b)
+        else:
+            related[a] = [b]
+
+    def add_parent_and_child(self, parent, child):
+        self._link(Relationship.PARENT, parent.name, child.name)
+        self._link(Relationship.CHILD, child.name, parent.name)
+
+    def add_siblings(self, a, b):
+        self._link(Relationship.SIBLING, a.name, b.name)
+        self._link(Relationship.SIBLING, b.name, a.name)
+
+    def find_all_children_of(self, name):
+        yield from self.index[Relationship.PARENT].get(name, ())
+
+    def find_all_parents_of(self, name):
+        yield from self.index[Relationship.CHILD].get(name, ())
+
+    def find_all_siblings_of(self, name):
+        # explicit siblings plus the other children of the same parents
+        seen = {name}
+        for sibling in self.index[Relationship.SIBLING].get(name, ()):
+            if sibling not in seen:
+                seen.add(sibling)
+                yield sibling
+        for parent in self.find_all_parents_of(name):
+            for sibling in self.find_all_children_of(parent):
+                if sibling not in seen:
+                    seen.add(sibling)
+                    yield sibling
+
+    def find_all_descendants_of(self, name, max_depth=None):
+        # Breadth first, yields (name, depth) for each descendant up to max_depth generations
+        seen = {name}
+        queue = deque([(name, 0)])
+        while queue:
+            current, depth = queue.popleft()
+            if max_depth is not None and depth == max_depth:
+                continue
+            for child in self.find_all_children_of(current):
+                if child not in seen:
+                    seen.add(child)
+                    yield child, depth + 1
+                    queue.append((child, depth + 1))
+
+    def find_all_grandchildren_of(self, name):
+        for descendant, depth in self.find_all_descendants_of(name, 2):
+            if depth == 2:
+                yield descendant
+
+class Research:  # High level module
+    def __init__(self, browser):
+        for p in browser.find_all_children_of('John'):
+            print(f'John has a child called {p}')
+
+
+def benchmark(edges, queries=3):
+    # Synthetic family: every person but the first has one parent picked among the people before them,
+    # each add_parent_and_child stores two edges (parent -> child and child -> parent)
+    people = [Person(f'person-{i}') for i in range(edges // 2 + 1)]
+    scan = Relationships()
+    indexed = AdjacencyRelationships()
+    for i in range(1, len(people)):
+        parent = people[random.randrange(i)]
+        scan.add_parent_and_child(parent, people[i])
+        indexed.add_parent_and_child(parent, people[i])
+    names = [random.choice(people).name for _ in range(queries)]
+
+    start = time.perf_counter()
+    expected = [list(scan.find_all_children_of(n)) for n in names]
+    scan_time = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    result = [list(indexed.find_all_children_of(n)) for n in names]
+    indexed_time = (time.perf_counter() - start) / queries
+
+    assert expected == result
+    print(f'{len(scan.relations)} edges, find_all_children_of: '
+          f'list scan {scan_time * 1000:.3f}ms, adjacency {indexed_time * 1000:.4f}ms')
+
+    start = time.perf_counter()
+    descendants = sum(1 for _ in indexed.find_all_descendants_of(people[0].name, 5))
+    print(f'  {descendants} descendants up to depth 5 in {(time.perf_counter() - start) * 1000:.3f}ms')
+
+
+if __name__ == '__main__':
+    parent = Person('John')
+    child1 = Person('Chris')
+    child2 = Person('Matt')
+    grandchild = Person('Emma')
+
+    relationships = AdjacencyRelationships()
+    relationships.add_parent_and_child(parent, child1)
+    relationships.add_parent_and_child(parent, child2)
+    relationships.add_parent_and_child(child1, grandchild)
+
+    Research(relationships)
+    print(f'Matt siblings: {list(relationships.find_all_siblings_of("Matt"))}')
+    print(f'John grandchildren: {list(relationships.find_all_grandchildren_of("John"))}')
+
+    # Benchmark: python dip_adjacency.py 10000000
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,174 @@
+# DIP - Compact relationships
+# Relationships stores two tuples per parent/child pair, each tuple pointing to Person objects and enum
+# members, hundreds of bytes per edge once everything is counted.
+# CompactRelationships is another low level module for the same RelationshipBrowser abstraction:
+#   - people are interned, each name gets an integer id (stored once)
+#   - edges live in parallel arrays: subject id, relationship value and object id
+#   - every person knows its first and last edge and every edge knows the next edge of the same subject,
+#     so lookups only walk the edges of that person (O(degree)) and adding an edge is O(1)
+# That is 13 bytes per edge plus 8 bytes and the name per person.
+
+from abc import abstractmethod
+from array import array
+from enum import Enum
+import random
+import sys
+import time
+import tracemalloc
+
+
+class Relationship(Enum):
+    PARENT = 0
+    CHILD = 1
+    SIBLING = 2
+
+class Person:
+    def __init__(self, name):
+        self.name = name
+
+class RelationshipBrowser:
+    @abstractmethod
+    def find_all_children_of(self, name):
+        pass
+
+class Relationships(RelationshipBrowser):  # Low level module, list of tuples
+    def __init__(self):
+        self.relations = []
+
+    def add_parent_and_child(self, parent, child):
+        self.relations.append(
+            (parent, Relationship.PARENT, child)
+        )
+        self.relations.append(
+            (child, Relationship.CHILD, parent)
+        )
+
+    def find_all_children_of(self, name):
+        for r in self.relations:
+            if r[0].name == name and r[1] == Relationship.PARENT:
+                yield r[2].name
+
+class CompactRelationships(RelationshipBrowser):  # Low level module, interned arrays
+    NO_EDGE = 0xFFFFFFFF
+
+    def __init__(self):
+        # people
+        self.ids = {}
+        self.names = []
+        self.first_edge = array('I')
+        self.last_edge = array('I')
+        # edges
+        self.subjects = array('I')
+        self.relations = array('B')
+        self.objects = array('I')
+        self.next_edge = array('I')
+
+    def intern(self, name):
+        id = self.ids.get(name)
+        if id is None:
+            id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.first_edge.append(self.NO_EDGE)
+            self.last_edge.append(self.NO_EDGE)
+        return id
+
+    def _add_edge(self, subject, relationship, object):
+        edge = len(self.subjects)
+        self.subjects.append(subject)
+        self.relations.append(relationship.value)
+        self.objects.append(object)
+        self.next_edge.append(self.NO_EDGE)
+        if self.first_edge[subject] == self.NO_EDGE:
+            self.first_edge[subject] = edge
+        else:
+            self.next_edge[self.last_edge[subject]] = edge
+        self.last_edge[subject] = edge
+
+    def add_parent_and_child(self, parent, child):
+        p = self.intern(parent.name)
+        c = self.intern(child.name)
+        self._add_edge(p, Relationship.PARENT, c)
+        self._add_edge(c, Relationship.CHILD, p)
+
+    def _related(self, name, relationship):
+        id = self.ids.get(name)
+        if id is None:
+            return
+        value = relationship.value
+        edge = self.first_edge[id]
+        while edge != self.NO_EDGE:
+            if self.relations[edge] == value:
+                yield self.names[self.objects[edge]]
+            edge = self.next_edge[edge]
+
+    def find_all_children_of(self, name):
+        return self._related(name, Relationship.PARENT)
+
+    def find_all_parents_of(self, name):
+        return self._related(name, Relationship.CHILD)
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def memory_usage(self):
+        # bytes used by the edge arrays and by the people (arrays, intern table and names)
+        edges = sum(a.itemsize * len(a) for a in (self.subjects, self.relations, self.objects, self.next_edge))
+        people = sum(a.itemsize * len(a) for a in (self.first_edge, self.last_edge))
+        people += sys.getsizeof(self.ids) + sys.getsizeof(self.names)
+        people += sum(sys.getsizeof(n) for n in self.names)
+        return edges, people
+
+    def memory_per_edge(self):
+        return sum(self.memory_usage()) / max(len(self), 1)
+
+class Research:  # High level module
+    def __init__(self, browser):
+        for p in browser.find_all_children_of('John'):
+            print(f'John has a child called {p}')
+
+
+def measure(store_class, pairs):
+    random.seed(0)
+    tracemalloc.start()
+    store = store_class()
+    people = [Person(f'person-{i}') for i in range(pairs + 1)]
+    for i in range(1, len(people)):
+        store.add_parent_and_child(people[random.randrange(i)], people[i])
+    del people
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, used
+
+
+if __name__ == '__main__':
+    parent = Person('John')
+    child1 = Person('Chris')
+    child2 = Person('Matt')
+
+    relationships = CompactRelationships()
+    relationships.add_parent_and_child(parent, child1)
+    relationships.add_parent_and_child(parent, child2)
+
+    Research(relationships)
+    print(f'Chris parents: {list(relationships.find_all_parents_of("Chris"))}')
+
+    # Benchmark: python dip_compact.py <parent/child pairs>
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tuples, tuples_memory = measure(Relationships, pairs)
+    compact, compact_memory = measure(CompactRelationships, pairs)
+    edges = len(tuples.relations)
+    print(f'{edges} edges: list of tuples {tuples_memory / edges:.0f} bytes/edge, '
+          f'compact {compact_memory / edges:.0f} bytes/edge '
+          f'(self reported {compact.memory_per_edge():.0f})')
+    edge_bytes, people_bytes = compact.memory_usage()
+    print(f'  compact edges {edge_bytes / edges:.0f} bytes/edge, people {people_bytes / len(compact.names):.0f} bytes/person')
+
+    names = [f'person-{random.randrange(pairs)}' for _ in range(3)]
+    start = time.perf_counter()
+    expected = [list(tuples.find_all_children_of(n)) for n in names]
+    scan_time = (time.perf_counter() - start) / len(names)
+    start = time.perf_counter()
+    result = [list(compact.find_all_children_of(n)) for n in names]
+    compact_time = (time.perf_counter() - start) / len(names)
+    assert expected == result
+    print(f'find_all_children_of: list scan {scan_time * 1000:.3f}ms, compact {compact_time * 1000:.4f}ms')
@@ -0,0 +1,125 @@
+# DIP - SQLite relationships
+# The reason for the RelationshipBrowser abstraction was to be able to change the relations list to a DB
+# in the future, this is that DB. Research does not change at all.
+# The relations live in a SQLite file, so they can be larger than RAM and opening an existing file costs
+# nothing (no loading step):
+#   - relations are inserted in bulk with executemany inside a single transaction
+#   - the table is clustered on (subject, relation, object) (WITHOUT ROWID), so it is its own covering index
+#     and looking up the children of someone is a range scan that never touches another page
+#   - find_all_children_of streams the rows from the cursor
+
+from abc import abstractmethod
+from enum import Enum
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+class Relationship(Enum):
+    PARENT = 0
+    CHILD = 1
+    SIBLING = 2
+
+class Person:
+    def __init__(self, name):
+        self.name = name
+
+class RelationshipBrowser:
+    @abstractmethod
+    def find_all_children_of(self, name):
+        pass
+
+class SqliteRelationships(RelationshipBrowser):  # Low level module
+    def __init__(self, filename, cache_size_mb=64):
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.execute(f'PRAGMA cache_size = -{cache_size_mb * 1024}')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS relations ('
+            ' subject TEXT NOT NULL,'
+            ' relation INTEGER NOT NULL,'
+            ' object TEXT NOT NULL,'
+            ' PRIMARY KEY (subject, relation, object)'
+            ') WITHOUT ROWID'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def _rows(pairs):
+        for parent, child in pairs:
+            yield parent.name, Relationship.PARENT.value, child.name
+            yield child.name, Relationship.CHILD.value, parent.name
+
+    def add_parent_and_child(self, parent, child):
+        self.add_parents_and_children([(parent, child)])
+
+    def add_parents_and_children(self, pairs):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO relations VALUES (?, ?, ?)',
+                self._rows(pairs)
+            )
+
+    def find_all_children_of(self, name):
+        cursor = self.connection.execute(
+            'SELECT object FROM relations WHERE subject = ? AND relation = ?',
+            (name, Relationship.PARENT.value)
+        )
+        for (child,) in cursor:
+            yield child
+
+    def close(self):
+        self.connection.close()
+
+class Research:  # High level module
+    def __init__(self, browser):
+        for p in browser.find_all_children_of('John'):
+            print(f'John has a child called {p}')
+
+
+def benchmark(filename, pairs, queries=1000):
+    people = [Person(f'person-{i}') for i in range(pairs + 1)]
+    db = SqliteRelationships(filename)
+    start = time.perf_counter()
+    db.add_parents_and_children(
+        (people[random.randrange(i)], people[i]) for i in range(1, len(people))
+    )
+    print(f'Inserted {pairs * 2} relations in {time.perf_counter() - start:.3f}s '
+          f'({os.path.getsize(filename) / 1024 / 1024:.0f}MB)')
+    db.close()
+
+    start = time.perf_counter()
+    db = SqliteRelationships(filename)
+    print(f'  cold start {(time.perf_counter() - start) * 1000:.3f}ms')
+
+    names = [random.choice(people).name for _ in range(queries)]
+    start = time.perf_counter()
+    for name in names:
+        for _ in db.find_all_children_of(name):
+            pass
+    print(f'  find_all_children_of {(time.perf_counter() - start) / queries * 1000:.4f}ms per query')
+    db.close()
+
+
+if __name__ == '__main__':
+    folder = tempfile.mkdtemp()
+
+    parent = Person('John')
+    child1 = Person('Chris')
+    child2 = Person('Matt')
+
+    relationships = SqliteRelationships(os.path.join(folder, 'family.db'))
+    relationships.add_parent_and_child(parent, child1)
+    relationships.add_parent_and_child(parent, child2)
+
+    Research(relationships)
+    relationships.close()
+
+    # Benchmark: python dip_sqlite.py <parent/child pairs>
+    benchmark(os.path.join(folder, 'big.db'), int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+    shutil.rmtree(folder)
@@ -0,0 +1,160 @@
+# Streaming the builder output
+# str(builder) renders recursively: every element builds a list of lines, joins it, and its parent joins
+# the result again, so the text of a deep element gets copied once per ancestor and a deep enough tree
+# hits the recursion limit.
+# HtmlElement.write walks the tree with an explicit stack (one entry per open element) and writes the pieces
+# straight to any object with a write() method (file, socket buffer, io.StringIO), producing exactly the
+# same text as str().
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+
+class HtmlElement:
+    indent_size = 2
+
+    def __init__(self, name='', text=''):
+        self.name = name
+        self.text = text
+        self.elements = []
+
+    def __str(self, indent):
+        lines = []
+        i = ' ' * (indent * self.indent_size)
+        lines.append(f'{i}<{self.name}>')
+
+        if self.text:
+            i1 = ' ' * ((indent + 1) * self.indent_size)
+            lines.append(f'{i1}{self.text}')
+
+        for e in self.elements:
+            lines.append(e.__str(indent + 1))
+
+        lines.append(f'{i}</{self.name}>')
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.__str(0)
+
+    def write(self, sink, buffer_size=4096):
+        # Pieces are buffered and handed to the sink every buffer_size pieces.
+        # Every piece starts with its new line and indentation, the very first new line is dropped.
+        size = self.indent_size
+        indents = ['\n', '\n' + ' ' * size]
+        buffer = []
+        started = False
+
+        def flush():
+            nonlocal started
+            chunk = ''.join(buffer)
+            sink.write(chunk if started else chunk[1:])
+            started = True
+            buffer.clear()
+
+        def open_tag(element, depth):
+            while len(indents) <= depth + 2:
+                indents.append('\n' + ' ' * (len(indents) * size))
+            text = f'{indents[depth + 1]}{element.text}' if element.text else ''
+            buffer.append(f'{indents[depth]}<{element.name}>{text}')
+            return iter(element.elements), depth + 1, f'{indents[depth]}</{element.name}>'
+
+        # the stack only holds the open elements: (remaining children, depth of the children, closing tag)
+        stack = [open_tag(self, 0)]
+        while stack:
+            children, depth, closing = stack[-1]
+            i = indents[depth]
+            i1 = indents[depth + 1]
+            for e in children:
+                if e.elements:
+                    stack.append(open_tag(e, depth))
+                    break
+                # leaf elements are written in one go
+                if e.text:
+                    buffer.append(f'{i}<{e.name}>{i1}{e.text}{i}</{e.name}>')
+                else:
+                    buffer.append(f'{i}<{e.name}>{i}</{e.name}>')
+                if len(buffer) >= buffer_size:
+                    flush()
+            else:
+                stack.pop()
+                buffer.append(closing)
+        flush()
+
+    @staticmethod
+    def create(name):
+        return HtmlBuilder(name)
+
+
+class HtmlBuilder:
+    def __init__(self, root_name):
+        self.root_name = root_name
+        self.__root = HtmlElement(root_name)
+
+    def add_child(self, child_name, child_text):
+        self.__root.elements.append(
+            HtmlElement(child_name, child_text)
+        )
+
+    def add_child_fluent(self, child_name, child_text):
+        self.__root.elements.append(
+            HtmlElement(child_name, child_text)
+        )
+        return self
+
+    def write(self, sink):
+        self.__root.write(sink)
+
+    def __str__(self):
+        return str(self.__root)
+
+
+def measure(render):
+    # time and memory are measured on separate runs, tracemalloc slows everything down
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+if __name__ == '__main__':
+    builder = HtmlBuilder('ul')
+    builder.add_child_fluent('li', 'hello')\
+        .add_child_fluent('li', 'world')
+    print('Streaming builder:')
+    builder.write(sys.stdout)
+    print()
+
+    # Benchmark: python 4_builder_streaming.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    builder = HtmlBuilder('ul')
+    for i in range(n):
+        builder.add_child('li', f'item {i}')
+
+    sink = io.StringIO()
+    builder.write(sink)
+    assert sink.getvalue() == str(builder)
+
+    elapsed, peak = measure(lambda: str(builder))
+    print(f'{n} li, str(builder):        {elapsed:.3f}s, peak {peak:.0f}MB')
+    with open(os.devnull, 'w') as devnull:
+        elapsed, peak = measure(lambda: builder.write(devnull))
+    print(f'{n} li, builder.write(file): {elapsed:.3f}s, peak {peak:.0f}MB')
+
+    # a deep tree is no problem without recursion
+    root = element = HtmlElement('div')
+    for _ in range(5_000):
+        element.elements.append(HtmlElement('div'))
+        element = element.elements[0]
+    with open(os.devnull, 'w') as devnull:
+        root.write(devnull)
+    try:
+        str(root)
+    except RecursionError:
+        print('5000 nested div: streamed fine, str() hit the recursion limit')
@@ -0,0 +1,239 @@
+# Compact document for the builder
+# Every HtmlElement carries a __dict__ and its own elements list, and rendering recomputes the indentation
+# string of every node.
+# HtmlDocument stores the whole tree in a few flat arrays instead, one slot per node:
+#   - the tag name as an index into the interned names
+#   - the text (a list shared by all the nodes)
+#   - the first child, last child and next sibling of the node (-1 when there is none)
+# Indentation prefixes are computed once per depth and rendering walks the arrays without recursion.
+# The builder has the same add_child / add_child_fluent API, it just targets a document.
+
+from array import array
+import sys
+import time
+import tracemalloc
+
+
+class HtmlElement:
+    indent_size = 2
+
+    def __init__(self, name='', text=''):
+        self.name = name
+        self.text = text
+        self.elements = []
+
+    def __str(self, indent):
+        lines = []
+        i = ' ' * (indent * self.indent_size)
+        lines.append(f'{i}<{self.name}>')
+
+        if self.text:
+            i1 = ' ' * ((indent + 1) * self.indent_size)
+            lines.append(f'{i1}{self.text}')
+
+        for e in self.elements:
+            lines.append(e.__str(indent + 1))
+
+        lines.append(f'{i}</{self.name}>')
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.__str(0)
+
+
+class HtmlBuilder:
+    def __init__(self, root_name):
+        self.root_name = root_name
+        self.__root = HtmlElement(root_name)
+
+    def add_child(self, child_name, child_text):
+        self.__root.elements.append(
+            HtmlElement(child_name, child_text)
+        )
+
+    def add_child_fluent(self, child_name, child_text):
+        self.__root.elements.append(
+            HtmlElement(child_name, child_text)
+        )
+        return self
+
+    def __str__(self):
+        return str(self.__root)
+
+
+class HtmlDocument:
+    indent_size = 2
+    NONE = -1
+
+    def __init__(self):
+        self.tag_names = []
+        self.tag_ids = {}
+        # one slot per node
+        self.names = array('H')
+        self.texts = []
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        # '\n' + indentation, per depth
+        self.indents = ['\n']
+
+    def _intern(self, name):
+        id = self.tag_ids.get(name)
+        if id is None:
+            id = self.tag_ids[name] = len(self.tag_names)
+            self.tag_names.append(name)
+        return id
+
+    def add_element(self, parent, name, text=''):
+        # Adds a node as the last child of parent (None for a root) and returns its id
+        node = len(self.texts)
+        self.names.append(self._intern(name))
+        self.texts.append(text)
+        self.first_child.append(self.NONE)
+        self.last_child.append(self.NONE)
+        self.next_sibling.append(self.NONE)
+        if parent is not None:
+            if self.first_child[parent] == self.NONE:
+                self.first_child[parent] = node
+            else:
+                self.next_sibling[self.last_child[parent]] = node
+            self.last_child[parent] = node
+        return node
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _tags(self, depth):
+        # Per depth, one list per piece indexed by tag: opening tag followed by the text indentation,
+        # opening tag alone and closing tag
+        indents = self.indents
+        while len(indents) <= depth + 1:
+            indents.append('\n' + ' ' * (len(indents) * self.indent_size))
+        i, i1 = indents[depth], indents[depth + 1]
+        return (
+            [f'{i}<{name}>{i1}' for name in self.tag_names],
+            [f'{i}<{name}>' for name in self.tag_names],
+            [f'{i}</{name}>' for name in self.tag_names],
+        )
+
+    def render(self, root=0):
+        texts, tags = self.texts, self.names
+        first_child, next_sibling = self.first_child, self.next_sibling
+        NONE = self.NONE
+        depth_tags = [self._tags(0), self._tags(1)]
+        with_text, without_text, closing = depth_tags[0]
+        tag, text = tags[root], texts[root]
+        if first_child[root] == NONE:
+            leaf = with_text[tag] + text if text else without_text[tag]
+            return (leaf + closing[tag])[1:]
+
+        parts = [with_text[tag] + text if text else without_text[tag]]
+        append = parts.append
+        ancestors = [(root, 0)]  # (node, depth) of the open elements
+        node, depth = first_child[root], 1
+        while True:
+            # render node and its next siblings, until one of them has children
+            with_text, without_text, closing = depth_tags[depth]
+            while node != NONE:
+                tag = tags[node]
+                text = texts[node]
+                if first_child[node] != NONE:
+                    append(with_text[tag] + text if text else without_text[tag])
+                    break
+                if text:
+                    append(with_text[tag] + text + closing[tag])
+                else:
+                    append(without_text[tag] + closing[tag])
+                node = next_sibling[node]
+            if node != NONE:
+                ancestors.append((node, depth))
+                node, depth = first_child[node], depth + 1
+                if len(depth_tags) == depth:
+                    depth_tags.append(self._tags(depth))
+                continue
+            node, depth = ancestors.pop()
+            append(depth_tags[depth][2][tags[node]])
+            if not ancestors:
+                break
+            node = next_sibling[node]
+        return ''.join(parts)[1:]
+
+
+class CompactHtmlBuilder:
+    def __init__(self, root_name, document=None):
+        self.root_name = root_name
+        self.document = document if document is not None else HtmlDocument()
+        self.__root = self.document.add_element(None, root_name)
+
+    def add_child(self, child_name, child_text):
+        self.document.add_element(self.__root, child_name, child_text)
+
+    def add_child_fluent(self, child_name, child_text):
+        self.document.add_element(self.__root, child_name, child_text)
+        return self
+
+    def __str__(self):
+        return self.document.render(self.__root)
+
+
+def measure(build):
+    tracemalloc.start()
+    tree = build()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    text = str(tree)
+    return text, used / 1024 / 1024, time.perf_counter() - start
+
+
+def flat_list(builder_class, n):
+    builder = builder_class('ul')
+    for i in range(n):
+        builder.add_child('li', f'item {i}')
+    return builder
+
+
+def classic_report(n):
+    # table > tr > 4 td, n elements overall
+    table = HtmlElement('table')
+    for r in range(n // 5):
+        row = HtmlElement('tr')
+        row.elements = [HtmlElement('td', f'cell {r}.{c}') for c in range(4)]
+        table.elements.append(row)
+    return table
+
+
+class CompactReport:
+    def __init__(self, n):
+        self.document = HtmlDocument()
+        table = self.document.add_element(None, 'table')
+        for r in range(n // 5):
+            row = self.document.add_element(table, 'tr')
+            for c in range(4):
+                self.document.add_element(row, 'td', f'cell {r}.{c}')
+
+    def __str__(self):
+        return self.document.render()
+
+
+def compare(label, n, classic_build, compact_build):
+    classic, classic_memory, classic_time = measure(classic_build)
+    compact, compact_memory, compact_time = measure(compact_build)
+    assert classic == compact
+    print(f'{label}, {n} elements')
+    print(f'  HtmlElement tree: {classic_memory:.0f}MB, rendered in {classic_time:.3f}s')
+    print(f'  HtmlDocument:     {compact_memory:.0f}MB, rendered in {compact_time:.3f}s '
+          f'(x{classic_time / compact_time:.1f})')
+
+
+if __name__ == '__main__':
+    builder = CompactHtmlBuilder('ul')
+    builder.add_child_fluent('li', 'hello')\
+        .add_child_fluent('li', 'world')
+    print('Compact builder:')
+    print(builder)
+
+    # Benchmark: python 5_builder_compact.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    compare('ul > li', n, lambda: flat_list(HtmlBuilder, n), lambda: flat_list(CompactHtmlBuilder, n))
+    compare('table > tr > td', n, lambda: classic_report(n), lambda: CompactReport(n))
@@ -0,0 +1,155 @@
+# Incremental rendering for the builder
+# str(builder) renders the whole tree again even when a single li changed.
+# Here every HtmlElement keeps the text it rendered last time. Changing an element (its name, its text or
+# its children) marks it dirty together with its ancestors, the path up to the root. Rendering again only
+# regenerates the dirty elements, the other ones hand over their cached text as it is.
+# Because of that the children must be changed through the element methods, not by touching the list.
+
+import random
+import sys
+import time
+
+
+class HtmlElement:
+    indent_size = 2
+
+    def __init__(self, name='', text=''):
+        self._name = name
+        self._text = text
+        self.elements = []
+        self.parent = None
+        self._cache = None  # (indent, rendered text)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if value != self._name:
+            self._name = value
+            self.mark_dirty()
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if value != self._text:
+            self._text = value
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        # once an element is dirty all its ancestors are dirty too, so we can stop there
+        element = self
+        while element is not None and element._cache is not None:
+            element._cache = None
+            element = element.parent
+
+    def add_element(self, element):
+        # an element lives in one tree only, it leaves its old parent first
+        if element.parent is not None:
+            element.parent.remove_element(element)
+        element.parent = self
+        self.elements.append(element)
+        self.mark_dirty()
+        return element
+
+    def remove_element(self, element):
+        self.elements.remove(element)
+        element.parent = None
+        self.mark_dirty()
+
+    def __str(self, indent):
+        if self._cache is not None and self._cache[0] == indent:
+            return self._cache[1]
+
+        lines = []
+        i = ' ' * (indent * self.indent_size)
+        lines.append(f'{i}<{self._name}>')
+
+        if self._text:
+            i1 = ' ' * ((indent + 1) * self.indent_size)
+            lines.append(f'{i1}{self._text}')
+
+        for e in self.elements:
+            lines.append(e.__str(indent + 1))
+
+        lines.append(f'{i}</{self._name}>')
+        rendered = '\n'.join(lines)
+        self._cache = (indent, rendered)
+        return rendered
+
+    def __str__(self):
+        return self.__str(0)
+
+    @staticmethod
+    def create(name):
+        return HtmlBuilder(name)
+
+
+class HtmlBuilder:
+    def __init__(self, root_name):
+        self.root_name = root_name
+        self.root = HtmlElement(root_name)
+
+    def add_child(self, child_name, child_text):
+        return self.root.add_element(HtmlElement(child_name, child_text))
+
+    def add_child_fluent(self, child_name, child_text):
+        self.root.add_element(HtmlElement(child_name, child_text))
+        return self
+
+    def __str__(self):
+        return str(self.root)
+
+
+def full_render(element, indent=0):
+    # what rendering costs without the cache
+    i = ' ' * (indent * element.indent_size)
+    lines = [f'{i}<{element.name}>']
+    if element.text:
+        lines.append(f'{" " * ((indent + 1) * element.indent_size)}{element.text}')
+    for e in element.elements:
+        lines.append(full_render(e, indent + 1))
+    lines.append(f'{i}</{element.name}>')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    builder = HtmlBuilder('ul')
+    hello = builder.add_child('li', 'hello')
+    builder.add_child('li', 'world')
+    print(builder)
+    hello.text = 'goodbye'
+    print(builder)
+
+    # Benchmark: a dashboard of <sections> div with <items> li each, one li changes between renders
+    # python 6_builder_incremental.py 100 1000
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    builder = HtmlBuilder('body')
+    cells = []
+    for s in range(sections):
+        section = builder.add_child('div', f'section {s}')
+        for i in range(items):
+            cells.append(section.add_element(HtmlElement('li', f'metric {s}.{i}: 0')))
+    str(builder)
+
+    renders = 20
+    full_time = incremental_time = 0
+    for r in range(renders):
+        random.choice(cells).text = f'metric updated: {r}'
+
+        start = time.perf_counter()
+        expected = full_render(builder.root)
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        rendered = str(builder)
+        incremental_time += time.perf_counter() - start
+
+        assert rendered == expected
+    print(f'{sections * items} li, one change per render: full {full_time / renders * 1000:.2f}ms, '
+          f'incremental {incremental_time / renders * 1000:.2f}ms (x{full_time / incremental_time:.1f})')
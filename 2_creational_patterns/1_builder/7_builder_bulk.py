@@ -0,0 +1,197 @@
+# Building people in bulk
+# The faceted builder is nice to build one person: every .lives / .works creates a new builder and every
+# field is one more method call. Loading a million rows from a CSV file that way is a lot of ceremony.
+# BulkPersonBuilder takes the rows (dicts or tuples) and a mapping attribute -> key in the row, and
+# builds all the people at once: one itemgetter pulls every mapped value out of a row and the values
+# go into the person in a single step, with no builder object per person.
+# PersonSlots is the same person with __slots__, it is smaller and can be built straight from the values.
+
+from itertools import starmap
+from operator import itemgetter
+import gc
+import sys
+import time
+
+
+class Person:
+    def __init__(self):
+        # address
+        self.street_address = None
+        self.postcode = None
+        self.city = None
+        # employment
+        self.company_name = None
+        self.position = None
+        self.annual_income = None
+
+    def __str__(self):
+        return f'Address: {self.street_address}, {self.postcode}, {self.city} ' +\
+                f'Employed at {self.company_name} as a {self.position} earning {self.annual_income}'
+
+
+class PersonSlots:
+    fields = ('street_address', 'postcode', 'city', 'company_name', 'position', 'annual_income')
+    __slots__ = fields
+
+    def __init__(self, street_address=None, postcode=None, city=None,
+                 company_name=None, position=None, annual_income=None):
+        self.street_address = street_address
+        self.postcode = postcode
+        self.city = city
+        self.company_name = company_name
+        self.position = position
+        self.annual_income = annual_income
+
+    __str__ = Person.__str__
+
+
+class PersonBuilder:
+    def __init__(self, person=None):
+        self.person = person if person is not None else Person()
+
+    @property
+    def works(self):
+        return PersonJobBuilder(self.person)
+
+    @property
+    def lives(self):
+        return PersonAddressBuilder(self.person)
+
+    def build(self):
+        return self.person
+
+
+class PersonJobBuilder(PersonBuilder):
+    def at(self, company_name):
+        self.person.company_name = company_name
+        return self
+
+    def as_a(self, position):
+        self.person.position = position
+        return self
+
+    def earning(self, annual_income):
+        self.person.annual_income = annual_income
+        return self
+
+
+class PersonAddressBuilder(PersonBuilder):
+    def at(self, street_address):
+        self.person.street_address = street_address
+        return self
+
+    def with_postcode(self, postcode):
+        self.person.postcode = postcode
+        return self
+
+    def in_city(self, city):
+        self.person.city = city
+        return self
+
+
+class BulkPersonBuilder:
+    def __init__(self, mapping, person_class=Person):
+        # mapping: person attribute -> key of the value in a row (dict key or tuple index)
+        self.person_class = person_class
+        self.attributes = tuple(mapping)
+        keys = tuple(mapping.values())
+        if len(keys) == 1:
+            key = keys[0]
+            self.values = lambda row: (row[key],)
+        else:
+            self.values = itemgetter(*keys)
+
+        # all the fields of a slots person are mapped: the values can go straight to the constructor
+        fields = getattr(person_class, 'fields', None)
+        self.positional = None
+        if fields is not None and set(fields) <= set(mapping):
+            self.positional = itemgetter(*(mapping[f] for f in fields))
+
+        # default values of the attributes that are not mapped, for the regular (__dict__) person
+        self.defaults = None
+        if not hasattr(person_class, '__slots__'):
+            self.defaults = {
+                k: v for k, v in vars(person_class()).items() if k not in mapping
+            }
+
+    def build_iter(self, rows):
+        cls = self.person_class
+        if self.positional is not None:
+            yield from starmap(cls, map(self.positional, rows))
+        elif hasattr(cls, '__slots__'):
+            attributes = self.attributes
+            for values in map(self.values, rows):
+                yield cls(**dict(zip(attributes, values)))
+        else:
+            # __init__ is skipped, the defaults and the values are copied in directly
+            attributes, defaults, new = self.attributes, self.defaults, cls.__new__
+            for values in map(self.values, rows):
+                person = new(cls)
+                attrs = person.__dict__
+                if defaults:
+                    attrs.update(defaults)
+                attrs.update(zip(attributes, values))
+                yield person
+
+    def build(self, rows, pause_gc=False):
+        # pause_gc: the collector is switched off (for the whole process) while the people are created,
+        # none of them can be garbage; only worth it for big batches when nothing else is running
+        if not pause_gc:
+            return list(self.build_iter(rows))
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return list(self.build_iter(rows))
+        finally:
+            if enabled:
+                gc.enable()
+
+
+if __name__ == '__main__':
+    pb = PersonBuilder()
+    person = pb\
+        .lives\
+            .at('123 London Road')\
+            .in_city('London')\
+            .with_postcode('SW1SD')\
+        .works\
+            .at('Fabrikam')\
+            .as_a('Engineer')\
+            .earning(123000)\
+        .build()
+    print(person)
+
+    # rows as they come from csv.reader: street, postcode, city, company, position, income
+    rows = [
+        ('123 London Road', 'SW1SD', 'London', 'Fabrikam', 'Engineer', '123000'),
+        ('1 Main Street', 'NW2', 'London', 'Contoso', 'Manager', '98000'),
+    ]
+    mapping = {
+        'street_address': 0, 'postcode': 1, 'city': 2,
+        'company_name': 3, 'position': 4, 'annual_income': 5
+    }
+    for p in BulkPersonBuilder(mapping).build(rows):
+        print(p)
+
+    # Benchmark: python 7_builder_bulk.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = [(f'{i} London Road', f'SW{i % 100}', 'London', 'Fabrikam', 'Engineer', i) for i in range(n)]
+
+    start = time.perf_counter()
+    fluent = [
+        PersonBuilder()
+            .lives.at(r[0]).with_postcode(r[1]).in_city(r[2])
+            .works.at(r[3]).as_a(r[4]).earning(r[5])
+            .build()
+        for r in rows
+    ]
+    fluent_time = time.perf_counter() - start
+    print(f'{n} people, fluent builder:          {fluent_time:.3f}s')
+
+    for label, cls, pause_gc in (('bulk builder', Person, False), ('bulk builder, gc paused', Person, True),
+                                 ('bulk builder (slots)', PersonSlots, False)):
+        start = time.perf_counter()
+        people = BulkPersonBuilder(mapping, cls).build(rows, pause_gc)
+        elapsed = time.perf_counter() - start
+        assert [str(p) for p in people[:1000]] == [str(p) for p in fluent[:1000]]
+        print(f'{n} people, {label + ":":<25} {elapsed:.3f}s (x{fluent_time / elapsed:.1f})')
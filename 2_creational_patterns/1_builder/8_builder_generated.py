@@ -0,0 +1,162 @@
+# Generated builders
+# The builders in 2_builder.py and 3_builder.py are written by hand, one method per field, and every step
+# goes through self.person. Here the fields are declared once and the builder class is generated from them
+# (the source is compiled with exec, once):
+#   - every fluent method stores the value in a slot of the builder and returns it
+#   - facets (lives, works) switch the class of the same builder object, nothing new is created
+#   - build() is one direct call to the constructor with all the values
+#   - validation is written into the methods only when asked for, production builders skip it
+
+from collections import namedtuple
+from keyword import iskeyword
+import sys
+import time
+
+Field = namedtuple('Field', 'attribute method facet validator', defaults=(None, None))
+
+
+class Person:
+    def __init__(self, name=None, position=None, date_of_birth=None,
+                 street_address=None, postcode=None, city=None,
+                 company_name=None, annual_income=None):
+        self.name = name
+        self.position = position
+        self.date_of_birth = date_of_birth
+        # address
+        self.street_address = street_address
+        self.postcode = postcode
+        self.city = city
+        # employment
+        self.company_name = company_name
+        self.annual_income = annual_income
+
+    def __str__(self):
+        return f'{self.name} born on {self.date_of_birth} works as {self.position} ' +\
+                f'at {self.company_name} earning {self.annual_income}, ' +\
+                f'lives at {self.street_address}, {self.postcode}, {self.city}'
+
+
+def is_text(value):
+    return isinstance(value, str) and bool(value)
+
+
+def is_positive(value):
+    return isinstance(value, (int, float)) and value > 0
+
+
+PERSON_SCHEMA = (
+    Field('name', 'called', validator=is_text),
+    Field('position', 'works_as_a', validator=is_text),
+    Field('date_of_birth', 'born', validator=is_text),
+    Field('street_address', 'at', 'lives', is_text),
+    Field('postcode', 'with_postcode', 'lives', is_text),
+    Field('city', 'in_city', 'lives', is_text),
+    Field('company_name', 'at', 'works', is_text),
+    Field('position', 'as_a', 'works', is_text),
+    Field('annual_income', 'earning', 'works', is_positive),
+)
+
+
+def check_identifier(kind, value):
+    # the names end up in generated source
+    if not isinstance(value, str) or not value.isidentifier() or iskeyword(value):
+        raise ValueError(f'{kind} {value!r} is not a valid identifier')
+
+
+def make_builder(name, target, schema, validate=True):
+    check_identifier('builder name', name)
+    methods_seen = set()
+    for f in schema:
+        check_identifier('attribute', f.attribute)
+        check_identifier('method', f.method)
+        if f.facet is not None:
+            check_identifier('facet', f.facet)
+        if (f.facet, f.method) in methods_seen:
+            raise ValueError(f'method {f.method!r} declared twice in facet {f.facet!r}')
+        methods_seen.add((f.facet, f.method))
+    attributes = list(dict.fromkeys(f.attribute for f in schema))
+    facets = list(dict.fromkeys(f.facet for f in schema if f.facet))
+    namespace = {'_target': target}
+
+    def methods(fields):
+        lines = []
+        for f in fields:
+            lines.append('')
+            lines.append(f'    def {f.method}(self, value):')
+            if validate and f.validator is not None:
+                # one validator per method, two methods can set the same attribute (works_as_a, works.as_a)
+                valid = f'_valid_{f.facet or ""}_{f.method}'
+                if valid in namespace:
+                    raise ValueError(f'the validator of {f.method!r} has the same name as another one ({valid})')
+                namespace[valid] = f.validator
+                lines.append(f'        if not {valid}(value):')
+                lines.append(f"            raise ValueError(f'{f.method}: invalid {f.attribute} {{value!r}}')")
+            lines.append(f'        self.{f.attribute} = value')
+            lines.append('        return self')
+        return lines
+
+    source = [f'class {name}:', f'    __slots__ = {tuple(attributes)!r}', '', '    def __init__(self):']
+    source += [f'        self.{a} = None' for a in attributes]
+    source += methods(f for f in schema if not f.facet)
+    for facet in facets:
+        source += [
+            '',
+            '    @property',
+            f'    def {facet}(self):',
+            f'        self.__class__ = {name}_{facet}',
+            '        return self',
+        ]
+    source += ['', '    def build(self):']
+    source += ['        return _target(' + ', '.join(f'{a}=self.{a}' for a in attributes) + ')']
+    for facet in facets:
+        source += ['', f'class {name}_{facet}({name}):', '    __slots__ = ()']
+        source += methods(f for f in schema if f.facet == facet)
+
+    source = '\n'.join(source) + '\n'
+    exec(source, namespace)
+    builder = namespace[name]
+    builder.source = source
+    return builder
+
+
+PersonBuilder = make_builder('PersonBuilder', Person, PERSON_SCHEMA)
+FastPersonBuilder = make_builder('FastPersonBuilder', Person, PERSON_SCHEMA, validate=False)
+
+
+if __name__ == '__main__':
+    me = PersonBuilder()\
+        .called('Nico')\
+        .works_as_a('DS')\
+        .born('1/1/1991')\
+        .lives\
+            .at('123 London Road')\
+            .in_city('London')\
+        .works\
+            .at('Fabrikam')\
+            .earning(123000)\
+        .build()
+    print(me)
+
+    try:
+        PersonBuilder().works.earning(-1)
+    except ValueError as e:
+        print(f'Validation: {e}')
+
+    print('Generated source:')
+    print(FastPersonBuilder.source)
+
+    # Benchmark: python 8_builder_generated.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    start = time.perf_counter()
+    for i in range(n):
+        Person(name='Nico', position='DS', date_of_birth='1/1/1991')
+    direct = time.perf_counter() - start
+    print(f'{n} people, constructor:             {direct:.3f}s')
+
+    for label, builder in (('builder', PersonBuilder), ('builder, no validation', FastPersonBuilder)):
+        start = time.perf_counter()
+        for i in range(n):
+            builder().called('Nico').works_as_a('DS').born('1/1/1991').build()
+        elapsed = time.perf_counter() - start
+        print(f'{n} people, {label + ":":<24} {elapsed:.3f}s (x{elapsed / direct:.1f} the constructor)')
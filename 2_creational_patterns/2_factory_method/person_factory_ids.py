@@ -0,0 +1,179 @@
+# Thread safe ids for the PersonFactory
+# PersonFactory.create_person bumps a class level counter with no synchronization, two threads can get the
+# same id. Putting a lock around it fixes that but then every single person waits on the same lock.
+# BlockIdAllocator hands out blocks of ids instead: every thread keeps its own range (threading.local) and
+# only goes to the shared sequence, under a lock, when the range runs out, once every block_size ids.
+# The shared sequence can be a counter in memory (threads) or a small file locked with flock (processes).
+
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+from exercise import Person
+
+
+class CounterSequence:
+    def __init__(self, start=0):
+        self.next = start
+        self.lock = threading.Lock()
+
+    def reserve(self, count):
+        # Returns the first id of a block of count ids
+        with self.lock:
+            start = self.next
+            self.next += count
+            return start
+
+
+class FileSequence:
+    # The next free id lives in a file, shared by all the processes using it
+    def __init__(self, filename, start=0):
+        self.filename = filename
+        self.lock = threading.Lock()
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if not f.read().strip():
+                f.write(str(start))
+
+    def reserve(self, count):
+        with self.lock, open(self.filename, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            start = int(f.read())
+            f.seek(0)
+            f.write(str(start + count))
+            f.truncate()
+            return start
+
+
+# a forked child must not reuse the ranges of its parent: one fork hook for all the live allocators
+_allocators = weakref.WeakSet()
+
+
+def _forget_ranges_after_fork():
+    for allocator in list(_allocators):
+        allocator._forget_ranges()
+
+
+os.register_at_fork(after_in_child=_forget_ranges_after_fork)
+
+
+class BlockIdAllocator:
+    def __init__(self, block_size=1024, sequence=None):
+        self.block_size = block_size
+        self.sequence = sequence if sequence is not None else CounterSequence()
+        self.local = threading.local()
+        _allocators.add(self)
+
+    def _forget_ranges(self):
+        self.local = threading.local()
+
+    def next_id(self):
+        local = self.local
+        try:
+            id = local.next
+            if id < local.end:
+                local.next = id + 1
+                return id
+        except AttributeError:
+            pass
+        id = self.sequence.reserve(self.block_size)
+        local.next, local.end = id + 1, id + self.block_size
+        return id
+
+    def reserve(self, count):
+        # count consecutive ids, from the thread range when it is big enough
+        local = self.local
+        start = getattr(local, 'next', 0)
+        if start + count <= getattr(local, 'end', 0):
+            local.next = start + count
+            return range(start, start + count)
+        start = self.sequence.reserve(count)
+        return range(start, start + count)
+
+
+class PersonFactory:
+    ids = BlockIdAllocator()
+
+    def create_person(self, name):
+        return Person(self.ids.next_id(), name)
+
+    def create_people(self, names):
+        names = list(names)
+        return list(map(Person, self.ids.reserve(len(names)), names))
+
+
+class LockedPersonFactory:
+    # The naive fix, one lock acquisition per person
+    id = 0
+    lock = threading.Lock()
+
+    def create_person(self, name):
+        with LockedPersonFactory.lock:
+            id = LockedPersonFactory.id
+            LockedPersonFactory.id += 1
+        return Person(id, name)
+
+
+def run_threads(factory, threads, per_thread):
+    people = []
+
+    def work():
+        created = [factory.create_person('worker') for _ in range(per_thread)]
+        people.extend(created)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    unique = len({p.id for p in people})
+    return elapsed, unique, len(people)
+
+
+if __name__ == '__main__':
+    pf = PersonFactory()
+
+    p1 = pf.create_person('Chris')
+    p2 = pf.create_person('Sarah')
+    print(p1)
+    print(p2)
+    for p in pf.create_people(['Ann', 'Bob', 'Carl']):
+        print(p)
+
+    # Benchmark: python person_factory_ids.py <threads> <people per thread>
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    for label, factory in (('lock per call', LockedPersonFactory()), ('block allocator', PersonFactory())):
+        elapsed, unique, total = run_threads(factory, threads, per_thread)
+        assert unique == total
+        print(f'{label:<16} {threads} threads, {total} people: {elapsed:.3f}s, all ids unique')
+
+    # processes sharing a file backed sequence
+    fd, filename = tempfile.mkstemp(suffix='.seq')
+    os.close(fd)
+    allocator = BlockIdAllocator(block_size=100, sequence=FileSequence(filename))
+    r, w = os.pipe()
+    children = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            ids = [allocator.next_id() for _ in range(1000)]
+            os.write(w, (' '.join(map(str, ids)) + '\n').encode())
+            os._exit(0)
+        children.append(pid)
+    os.close(w)
+    for pid in children:
+        os.waitpid(pid, 0)
+    with os.fdopen(r) as pipe:
+        ids = pipe.read().split()
+    os.remove(filename)
+    assert len(ids) == len(set(ids)) == 4000
+    print('4 processes, 4000 ids from the file sequence, all unique')
@@ -0,0 +1,95 @@
+# Batch factory methods for points
+# PointFactory.new_polar_point calls cos/sin from python and allocates a Point per sample, converting a
+# sensor sweep of millions of polar samples that way is mostly interpreter overhead.
+# BatchPointFactory adds factory methods that take whole sequences of coordinates and return a PointArray:
+# the x and y columns are kept in two NumPy arrays and converted in one vectorized operation.
+# Without NumPy installed the columns are arrays of doubles from the standard library and the conversion is
+# map() over the C functions (cos, sin, mul), still no python code per sample but a lot slower.
+# Point objects are only created when somebody indexes or iterates the array.
+
+from array import array
+from math import cos, sin
+from operator import mul
+import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from factory import Point, PointFactory
+
+
+class PointArray:
+    def __init__(self, xs, ys):
+        if len(xs) != len(ys):
+            raise ValueError('x and y must have the same length')
+        self.xs = xs
+        self.ys = ys
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.xs[index], self.ys[index])
+        return Point(float(self.xs[index]), float(self.ys[index]))
+
+    def __iter__(self):
+        return map(Point, map(float, self.xs), map(float, self.ys))
+
+    def __str__(self):
+        return f'PointArray of {len(self)} points'
+
+
+class BatchPointFactory(PointFactory):
+    @staticmethod
+    def new_cartesian_points(xs, ys):
+        if len(xs) != len(ys):
+            raise ValueError('x and y must have the same length')
+        if np is not None:
+            return PointArray(np.array(xs, dtype=float), np.array(ys, dtype=float))
+        return PointArray(array('d', xs), array('d', ys))
+
+    @staticmethod
+    def new_polar_points(rhos, thetas):
+        if len(rhos) != len(thetas):
+            raise ValueError('rho and theta must have the same length')
+        if np is not None:
+            rhos = np.asarray(rhos, dtype=float)
+            thetas = np.asarray(thetas, dtype=float)
+            return PointArray(rhos * np.cos(thetas), rhos * np.sin(thetas))
+        rhos = rhos if isinstance(rhos, array) else array('d', rhos)
+        thetas = thetas if isinstance(thetas, array) else array('d', thetas)
+        return PointArray(
+            array('d', map(mul, rhos, map(cos, thetas))),
+            array('d', map(mul, rhos, map(sin, thetas)))
+        )
+
+
+if __name__ == '__main__':
+    points = BatchPointFactory.new_polar_points([1, 2], [0, 2])
+    print(points)
+    for p in points:
+        print(p)
+    print(PointFactory.new_polar_point(2, 2))
+
+    # Benchmark: python point_array.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rhos = array('d', (random.uniform(0, 10) for _ in range(n)))
+    thetas = array('d', (random.uniform(0, 6.28) for _ in range(n)))
+
+    start = time.perf_counter()
+    one_by_one = [PointFactory.new_polar_point(r, t) for r, t in zip(rhos, thetas)]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = BatchPointFactory.new_polar_points(rhos, thetas)
+    batch_time = time.perf_counter() - start
+
+    for i in random.sample(range(n), min(n, 1000)):
+        assert abs(batch[i].x - one_by_one[i].x) < 1e-9 and abs(batch[i].y - one_by_one[i].y) < 1e-9
+    print(f'{n} polar samples: new_polar_point {single_time:.3f}s, '
+          f'new_polar_points {batch_time:.3f}s (x{single_time / batch_time:.1f})')
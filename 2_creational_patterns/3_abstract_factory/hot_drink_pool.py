@@ -0,0 +1,188 @@
+# Pooled hot drinks
+# Every prepare() creates a new Tea or Coffee and the drink is thrown away as soon as it is consumed.
+# A DrinkPool keeps the drinks that come back in a free list per drink type (at most max_size each)
+# and PooledFactory puts a pool in front of any HotDrinkFactory:
+#   - acquire(amount) reuses a free drink of the right type (its __init__ runs again) or asks the factory
+#   - release(drink) runs the reset hook of the drink type and puts the drink back, or drops it when full;
+#     releasing a drink that is already back in the pool is a ValueError
+#   - serve(amount) is acquire/release as a context manager
+# stats() tells how often a drink was reused (hit rate) and how many drinks wait in each free list.
+
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+import gc
+import sys
+import time
+
+from hot_drink_registry import Coffee, CoffeeFactory, Tea, TeaFactory
+
+
+class PoolStats(namedtuple('PoolStats', 'hits misses dropped sizes')):
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __str__(self):
+        sizes = ', '.join(f'{name} {size}' for name, size in self.sizes.items())
+        return f'hit rate {self.hit_rate:.1%} ({self.hits} hits, {self.misses} misses), ' +\
+               f'{self.dropped} dropped, free: {sizes}'
+
+
+class DrinkPool:
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.free = defaultdict(list)
+        # ids of the drinks in the free lists, a drink released twice would be handed out twice
+        self.pooled = set()
+        self.reset_hooks = {}
+        self.hits = self.misses = self.dropped = 0
+
+    def on_reset(self, drink_class):
+        # decorator, the hook gets every drink of that class that comes back to the pool
+        def decorator(hook):
+            self.reset_hooks[drink_class] = hook
+            return hook
+        return decorator
+
+    def get(self, drink_class):
+        # a free drink of that class, None when there is none
+        free = self.free[drink_class]
+        if free:
+            self.hits += 1
+            drink = free.pop()
+            self.pooled.discard(id(drink))
+            return drink
+        self.misses += 1
+        return None
+
+    def put(self, drink):
+        if id(drink) in self.pooled:
+            raise ValueError(f'{type(drink).__name__} released twice')
+        drink_class = type(drink)
+        hook = self.reset_hooks.get(drink_class)
+        if hook is not None:
+            hook(drink)
+        free = self.free[drink_class]
+        if len(free) < self.max_size:
+            free.append(drink)
+            self.pooled.add(id(drink))
+        else:
+            self.dropped += 1
+
+    def stats(self):
+        sizes = {cls.__name__: len(free) for cls, free in self.free.items()}
+        return PoolStats(self.hits, self.misses, self.dropped, sizes)
+
+
+class PooledFactory:
+    def __init__(self, factory, drink_class, pool=None):
+        self.factory = factory
+        self.drink_class = drink_class
+        self.pool = pool if pool is not None else DrinkPool()
+
+    def acquire(self, amount):
+        drink = self.pool.get(self.drink_class)
+        if drink is None:
+            return self.factory.prepare(amount)
+        drink.__init__(amount)
+        return drink
+
+    prepare = acquire
+
+    def release(self, drink):
+        self.pool.put(drink)
+
+    @contextmanager
+    def serve(self, amount):
+        drink = self.acquire(amount)
+        try:
+            yield drink
+        finally:
+            self.release(drink)
+
+
+class GCPauses:
+    # Times every collection with gc.callbacks
+    def __init__(self):
+        self.pauses = []
+        self.start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.start = time.perf_counter()
+        else:
+            self.pauses.append(time.perf_counter() - self.start)
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def sustained_orders(tea, coffee, release, rate, seconds, tick=0.01, in_flight=2000):
+    # rate orders per second, in ticks of tick seconds, in_flight drinks are waiting to be consumed,
+    # release gets the consumed drinks (None: they are just dropped)
+    per_tick = int(rate * tick)
+    waiting = []
+    created = busy = 0
+    next_tick = time.perf_counter()
+    for _ in range(int(seconds / tick)):
+        start = time.perf_counter()
+        for i in range(per_tick):
+            factory = tea if i & 1 else coffee
+            waiting.append(factory.prepare(30 + i % 200))
+        created += per_tick
+        # the oldest drinks are consumed and go back
+        while len(waiting) > in_flight:
+            served = waiting[:per_tick]
+            del waiting[:per_tick]
+            for drink in served:
+                drink.amount
+            if release is not None:
+                for drink in served:
+                    release(drink)
+        busy += time.perf_counter() - start
+        next_tick += tick
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return created, busy
+
+
+if __name__ == '__main__':
+    pool = DrinkPool(max_size=4)
+
+    @pool.on_reset(Tea)
+    def empty_cup(drink):
+        drink.amount = 0
+
+    tea = PooledFactory(TeaFactory(), Tea, pool)
+    coffee = PooledFactory(CoffeeFactory(), Coffee, pool)
+    with tea.serve(200) as drink:
+        drink.consume()
+    with tea.serve(250) as again:
+        again.consume()
+    print(f'Same cup: {drink is again}')
+    with coffee.serve(50) as drink:
+        drink.consume()
+    print(pool.stats())
+
+    # Benchmark: python hot_drink_pool.py <seconds> <orders per second>
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    pool = DrinkPool(max_size=4000)
+    for label, tea, coffee, release in (
+            ('new drink per order', TeaFactory(), CoffeeFactory(), None),
+            ('pooled drinks', PooledFactory(TeaFactory(), Tea, pool), PooledFactory(CoffeeFactory(), Coffee, pool),
+             pool.put)):
+        with GCPauses() as pauses:
+            created, busy = sustained_orders(tea, coffee, release, rate, seconds)
+        allocated = created if release is None else pool.stats().misses
+        longest = max(pauses.pauses, default=0) * 1000
+        print(f'{label:<20} {created} orders in {seconds}s, busy {busy / seconds:.0%}, '
+              f'{allocated} drinks allocated, {len(pauses.pauses)} collections, '
+              f'{sum(pauses.pauses) * 1000:.1f}ms in gc, longest {longest:.2f}ms')
+    print(f'pool: {pool.stats()}')
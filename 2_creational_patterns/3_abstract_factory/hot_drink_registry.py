@@ -0,0 +1,143 @@
+# Registry of drink factories
+# HotDrinkMachine finds its factories with eval() on the names of an enum and takes the orders with input().
+# Here every factory registers itself with a decorator when its class is defined, the registry keeps
+# name -> factory instance, so factories are created once and found with a dict lookup.
+# prepare_many takes a whole list of orders (drink name, amount), groups them per factory and lets each
+# factory prepare its batch, the drinks come back in the order of the orders.
+
+from abc import ABC
+import random
+import sys
+import time
+
+
+class HotDrink(ABC):
+    def __init__(self, amount):
+        self.amount = amount
+
+    def consume(self):
+        pass
+
+
+class Tea(HotDrink):
+    def consume(self):
+        print(f'This tea is delicious ({self.amount}ml)')
+
+
+class Coffee(HotDrink):
+    def consume(self):
+        print(f'This coffee is delicious ({self.amount}ml)')
+
+
+class HotDrinkFactory(ABC):
+    def prepare(self, amount):
+        pass
+
+    def prepare_many(self, amounts):
+        return [self.prepare(amount) for amount in amounts]
+
+
+class HotDrinkMachine:
+    factories = {}
+
+    @classmethod
+    def register(cls, name):
+        def decorator(factory_class):
+            cls.factories[name] = factory_class()
+            return factory_class
+        return decorator
+
+    @property
+    def available_drinks(self):
+        return list(self.factories)
+
+    def make_drink(self, name, amount):
+        try:
+            factory = self.factories[name]
+        except KeyError:
+            raise ValueError(f'No drink called {name!r}, available: {self.available_drinks}') from None
+        return factory.prepare(amount)
+
+    def prepare_many(self, orders):
+        # orders: (drink name, amount) pairs, any iterable
+        # one pass over the orders groups the amounts per drink, each factory prepares its batch and
+        # the drinks are handed back in the order of the orders
+        batches = {}
+        names = []
+        for name, amount in orders:
+            batch = batches.get(name)
+            if batch is None:
+                if name not in self.factories:
+                    raise ValueError(f'No drink called {name!r}, available: {self.available_drinks}')
+                batch = batches[name] = []
+            batch.append(amount)
+            names.append(name)
+
+        prepared = {}
+        for name, amounts in batches.items():
+            drinks = list(self.factories[name].prepare_many(amounts))
+            if len(drinks) != len(amounts):
+                raise ValueError(f'The {name!r} factory prepared {len(drinks)} drinks for {len(amounts)} orders')
+            prepared[name] = iter(drinks)
+        return list(map(next, map(prepared.__getitem__, names)))
+
+
+@HotDrinkMachine.register('tea')
+class TeaFactory(HotDrinkFactory):
+    def prepare(self, amount):
+        # Put in tea bag, boil water, pour amount ml
+        return Tea(amount)
+
+
+@HotDrinkMachine.register('coffee')
+class CoffeeFactory(HotDrinkFactory):
+    def prepare(self, amount):
+        # Grind some beans, boil water, pour amount ml
+        return Coffee(amount)
+
+    def prepare_many(self, amounts):
+        # grind the beans once for the whole batch
+        return list(map(Coffee, amounts))
+
+
+class EvalHotDrinkMachine:
+    # The eval based machine of abstract_factory.py, without the input() calls
+    def __init__(self):
+        self.factories = []
+        for name in ('Coffee', 'Tea'):
+            self.factories.append((name.lower(), eval(name + 'Factory')()))
+
+    def make_drink(self, name, amount):
+        for drink_name, factory in self.factories:
+            if drink_name == name:
+                return factory.prepare(amount)
+
+
+if __name__ == '__main__':
+    hdm = HotDrinkMachine()
+    print(f'Available drinks: {hdm.available_drinks}')
+    hdm.make_drink('tea', 200).consume()
+    for drink in hdm.prepare_many([('coffee', 50), ('tea', 250), ('coffee', 30)]):
+        drink.consume()
+
+    # Benchmark: python hot_drink_registry.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    orders = [(random.choice(('tea', 'coffee')), random.randint(30, 300)) for _ in range(n)]
+
+    start = time.perf_counter()
+    eval_machine = EvalHotDrinkMachine()
+    served = [eval_machine.make_drink(name, amount) for name, amount in orders]
+    eval_time = time.perf_counter() - start
+    del served
+
+    start = time.perf_counter()
+    served = [hdm.make_drink(name, amount) for name, amount in orders]
+    single_time = time.perf_counter() - start
+    del served
+
+    start = time.perf_counter()
+    drinks = hdm.prepare_many(orders)
+    batch_time = time.perf_counter() - start
+    assert [(type(d).__name__.lower(), d.amount) for d in drinks] == orders
+    print(f'{n} orders: eval machine {eval_time:.3f}s, registry {single_time:.3f}s, '
+          f'prepare_many {batch_time:.3f}s')
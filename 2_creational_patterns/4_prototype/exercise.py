@@ -1,16 +1,20 @@
-from copy import deepcopy
+from prototype_cloner import CLONE, SHARE, clone
 
 
 class Point:
+    clone_plan = {'x': SHARE, 'y': SHARE}
+
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
 
 
 class Line:
+    clone_plan = {'start': CLONE, 'end': CLONE}
+
     def __init__(self, start=Point(), end=Point()):
         self.start = start
         self.end = end
 
     def deep_copy(self):
-        return deepcopy(self)
+        return clone(self)
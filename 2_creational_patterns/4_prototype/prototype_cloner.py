@@ -0,0 +1,109 @@
+# Cloning prototypes without deepcopy
+# copy.deepcopy does not know anything about the object: it keeps a memo of everything it copied, looks up
+# __deepcopy__ / __reduce_ex__ and rebuilds the object through reflection, for every object in the tree.
+# Our prototypes have a small shape we know in advance, so a prototype class declares how to copy each of
+# its attributes in clone_plan:
+#   SHARE     the value is immutable (a name, a number), the clone gets the same object
+#   CLONE     the value is another prototype, it is cloned with its own plan
+#   DEEPCOPY  anything else, copy.deepcopy of that value
+# The first time a class is cloned its plan is compiled into a function that calls the constructor directly,
+# e.g. for the Employee: _cls(name=obj.name, address=clone(obj.address)).
+# Only the attributes listed in the plan are copied, anything else set on the object is not. A plan belongs
+# to the class that declares it: a subclass without a clone_plan of its own (it may have more attributes)
+# is deep copied, like the objects without a plan.
+# The plan copies a tree: objects shared by two attributes are copied twice and cycles are not supported,
+# use deepcopy for those.
+# register_cloner(cls, function) sets the clone function of a class by hand.
+
+from copy import deepcopy
+from inspect import Parameter, signature
+
+SHARE = 'share'
+CLONE = 'clone'
+DEEPCOPY = 'deepcopy'
+
+_cloners = {t: lambda obj: obj for t in (int, float, complex, bool, str, bytes, type(None))}
+
+
+def compile_cloner(cls):
+    plan = cls.clone_plan
+    for how in plan.values():
+        if how not in (SHARE, CLONE, DEEPCOPY):
+            raise ValueError(f'{cls.__name__}.clone_plan: unknown action {how!r}')
+
+    def value(attribute):
+        how = plan[attribute]
+        if how == SHARE:
+            return f'obj.{attribute}'
+        return f'{"_clone" if how == CLONE else "_deepcopy"}(obj.{attribute})'
+
+    parameters = signature(cls).parameters
+    arguments = []
+    for name, parameter in parameters.items():
+        if name in plan:
+            arguments.append(f'{name}={value(name)}')
+        elif parameter.default is Parameter.empty and \
+                parameter.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+            raise ValueError(f'{cls.__name__}.clone_plan has no entry for the argument {name!r}')
+    # attributes that are not constructor arguments are set afterwards
+    extra = [a for a in plan if a not in parameters]
+
+    source = ['def clone(obj):', f'    new = _cls({", ".join(arguments)})']
+    source += [f'    new.{a} = {value(a)}' for a in extra]
+    source += ['    return new']
+    source = '\n'.join(source) + '\n'
+    namespace = {'_cls': cls, '_clone': clone, '_deepcopy': deepcopy}
+    exec(source, namespace)
+    cloner = namespace['clone']
+    cloner.source = source
+    return cloner
+
+
+def clone(obj):
+    try:
+        return _cloners[type(obj)](obj)
+    except KeyError:
+        pass
+    cls = type(obj)
+    cloner = compile_cloner(cls) if 'clone_plan' in cls.__dict__ else deepcopy
+    _cloners[cls] = cloner
+    return cloner(obj)
+
+
+def register_cloner(cls, cloner):
+    _cloners[cls] = cloner
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from exercise import Line, Point
+    from prototype_factory import Employee, EmployeeFactory
+
+    line = Line(Point(0, 1), Point(2, 3))
+    copied = line.deep_copy()
+    copied.end.x = 10
+    print(f'line ends at ({line.end.x}, {line.end.y}), copy ends at ({copied.end.x}, {copied.end.y})')
+    print(compile_cloner(Employee).source)
+
+    # Benchmark: python prototype_cloner.py 200000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    proto = EmployeeFactory.main_office_employee
+    for label, prototype in (('employee', proto), ('line', line)):
+        start = time.perf_counter()
+        for _ in range(n):
+            deepcopy(prototype)
+        deepcopy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(n):
+            clone(prototype)
+        clone_time = time.perf_counter() - start
+        print(f'{n} {label} copies: deepcopy {deepcopy_time:.3f}s, clone {clone_time:.3f}s '
+              f'(x{deepcopy_time / clone_time:.1f})')
+
+    start = time.perf_counter()
+    for i in range(n):
+        EmployeeFactory.new_main_office_employee('John', i)
+    print(f'{n} employees from the factory: {time.perf_counter() - start:.3f}s')
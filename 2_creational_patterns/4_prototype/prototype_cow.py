@@ -0,0 +1,146 @@
+# Copy-on-write prototypes
+# A new employee from the EmployeeFactory is a full copy of the prototype: a new Employee and a new Address,
+# although only the name and the suite are going to change.
+# cow_clone(proto) returns an overlay instead, a subclass of the prototype class generated from its
+# clone_plan (see prototype_cloner.py) with one slot per attribute and a reference to the prototype:
+#   - an attribute that was written lives in its slot
+#   - an attribute that was never written is read from the prototype
+#   - a nested prototype (CLONE) is read as an overlay of its own, created the first time it is touched,
+#     so clone.address.suite = 102 copies the path employee -> address and nothing else
+#   - a DEEPCOPY attribute is deep copied the first time it is read, it could be changed in place
+# The overlays are instances of the prototype class, isinstance and the methods work as usual.
+# clone() of prototype_cloner.py works on an overlay too, it returns a regular object (materialize).
+# The prototype is read live: changing a prototype changes every clone that did not write that attribute.
+# A prototype must not change once it has copy-on-write clones, CowEmployeeFactory keeps its own copies of
+# the EmployeeFactory prototypes for that reason.
+
+from copy import deepcopy
+
+from prototype_cloner import CLONE, DEEPCOPY, clone, register_cloner
+from prototype_factory import Employee, EmployeeFactory
+
+_cow_classes = {}
+# overlay class -> prototype class
+_overlays = {}
+
+
+def cow_class(cls):
+    try:
+        return _cow_classes[cls]
+    except KeyError:
+        pass
+    plan = cls.clone_plan
+
+    def __init__(self, base):
+        self._base = base
+
+    def __getattr__(self, name):
+        # only called for the attributes that were never written
+        if name == '_base':
+            raise AttributeError(name)
+        value = getattr(self._base, name)
+        how = plan.get(name)
+        if how == CLONE:
+            value = cow_clone(value)
+            setattr(self, name, value)
+        elif how == DEEPCOPY:
+            value = deepcopy(value)
+            setattr(self, name, value)
+        return value
+
+    namespace = {'__slots__': ('_base',) + tuple(plan), '__init__': __init__, '__getattr__': __getattr__}
+    overlay = type(f'{cls.__name__}COW', (cls,), namespace)
+    _cow_classes[cls] = overlay
+    _overlays[overlay] = cls
+    register_cloner(overlay, materialize)
+    return overlay
+
+
+def cow_clone(proto):
+    # the clone of an overlay is an overlay of the same prototype class on top of it
+    cls = _overlays.get(type(proto), type(proto))
+    if 'clone_plan' not in cls.__dict__:
+        return clone(proto)
+    return cow_class(cls)(proto)
+
+
+def materialize(obj):
+    # a regular object, a clone of what the overlay shows
+    overlay = type(obj)
+    cls = _overlays.get(overlay)
+    if cls is None:
+        return obj
+    result = cls.__new__(cls)
+    for attribute, how in cls.clone_plan.items():
+        try:
+            # the slot of the overlay, without creating overlays for the attributes never touched
+            value = getattr(overlay, attribute).__get__(obj, overlay)
+        except AttributeError:
+            value = getattr(obj._base, attribute)
+        if how == CLONE:
+            value = clone(value)
+        elif how == DEEPCOPY:
+            value = deepcopy(value)
+        setattr(result, attribute, value)
+    return result
+
+
+class CowEmployeeFactory:
+    # EmployeeFactory with copy-on-write employees, on copies of its prototypes that nobody changes
+    main_office_employee = clone(EmployeeFactory.main_office_employee)
+    aux_office_employee = clone(EmployeeFactory.aux_office_employee)
+
+    @staticmethod
+    def __new_employee(proto, name, suite):
+        result = cow_clone(proto)
+        result.name = name
+        result.address.suite = suite
+        return result
+
+    @staticmethod
+    def new_main_office_employee(name, suite):
+        return CowEmployeeFactory.__new_employee(CowEmployeeFactory.main_office_employee, name, suite)
+
+    @staticmethod
+    def new_aux_office_employee(name, suite):
+        return CowEmployeeFactory.__new_employee(CowEmployeeFactory.aux_office_employee, name, suite)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import tracemalloc
+
+    john = CowEmployeeFactory.new_main_office_employee('John', 101)
+    jane = CowEmployeeFactory.new_aux_office_employee('Jane', 102)
+    print(john)
+    print(jane)
+    print(f'isinstance(john, Employee): {isinstance(john, Employee)}')
+    print(f'prototype untouched: {CowEmployeeFactory.main_office_employee}')
+    print(f'materialized: {materialize(john)} ({type(materialize(john)).__name__})')
+
+    # Benchmark: python prototype_cow.py 1000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    names = [f'employee {i}' for i in range(n)]
+    for label, factory in (('deepcopy', None), ('copy-on-write', CowEmployeeFactory)):
+        if factory is None:
+            def new_employee(name, suite, proto=EmployeeFactory.main_office_employee):
+                result = deepcopy(proto)
+                result.name = name
+                result.address.suite = suite
+                return result
+        else:
+            new_employee = factory.new_main_office_employee
+
+        start = time.perf_counter()
+        employees = [new_employee(name, i) for i, name in enumerate(names)]
+        elapsed = time.perf_counter() - start
+        del employees
+
+        tracemalloc.start()
+        employees = [new_employee(name, i) for i, name in enumerate(names)]
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del employees
+        print(f'{n} employees, {label:<14} {elapsed:.3f}s, {memory / 2 ** 20:.0f}MB '
+              f'({memory / n:.0f} bytes per employee)')
@@ -2,10 +2,12 @@
 # you can put them into a Factory and then create a bunch of factory methods so that the construction
 # of copies of this prototypes is even easier
 
-import copy
+from prototype_cloner import CLONE, SHARE, clone
 
 
 class Address:
+    clone_plan = {'street_address': SHARE, 'suite': SHARE, 'city': SHARE}
+
     def __init__(self, street_address, suite, city):
         self.street_address = street_address
         self.city = city
@@ -16,6 +18,8 @@ class Address:
 
 
 class Employee:
+    clone_plan = {'name': SHARE, 'address': CLONE}
+
     def __init__(self, name, address):
         self.name = name
         self.address = address
@@ -30,7 +34,7 @@ class EmployeeFactory:
 
     @staticmethod
     def __new_employee(proto, name, suite):
-        result = copy.deepcopy(proto)
+        result = clone(proto)
         result.name = name
         result.address.suite = suite
         return result
@@ -52,7 +56,8 @@ class EmployeeFactory:
         )
 
 
-john = EmployeeFactory.new_main_office_employee('John', 101)
-jane = EmployeeFactory.new_aux_office_employee('Jane', 102)
-print(john)
-print(jane)
+if __name__ == '__main__':
+    john = EmployeeFactory.new_main_office_employee('John', 101)
+    jane = EmployeeFactory.new_aux_office_employee('Jane', 102)
+    print(john)
+    print(jane)
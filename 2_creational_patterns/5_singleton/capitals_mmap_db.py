@@ -0,0 +1,235 @@
+# Memory mapped capitals database
+# The Database of singleton_testability.py reads the whole capitals file and builds a dict before the
+# first query can be answered, with millions of cities that is a long cold start.
+# Here the capitals file is turned once into a sorted index file (an external sort, so the file can be
+# bigger than memory):
+#   header: magic, number of cities, position of the offsets
+#   data:   'name\tpopulation\n' lines sorted by name
+#   offsets: position of every line, 8 bytes each
+# Opening the database only maps the index file, a lookup is a binary search over the offsets that reads
+# a few names from the map, recent answers are kept in an LRU cache.
+# The index is built again when the capitals file is newer than it.
+
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+import mmap
+import os
+import struct
+import tempfile
+
+from singleton_thread_safe import ThreadSafeSingleton
+
+MAGIC = b'CAPIDX01'
+HEADER = struct.Struct('<8sQQ')
+
+
+def read_capitals(filename):
+    # (name, population) pairs from the two lines per city format of capitals.txt
+    with open(filename, 'rb') as f:
+        for name in f:
+            population = next(f, None)
+            if population is None:
+                break
+            yield name.strip(), int(population)
+
+
+def build_index(capitals_filename, index_filename, run_size=1_000_000):
+    # a city listed twice keeps its last population, like the dict of Database: the runs are sorted by
+    # name and then by position in the capitals file, the last line of every name is kept
+    cities = ((name, position, population)
+              for position, (name, population) in enumerate(read_capitals(capitals_filename)))
+    runs = []
+    try:
+        # sorted runs of run_size cities, then one merge of all the runs
+        while True:
+            run = sorted(islice(cities, run_size))
+            if not run:
+                break
+            f = tempfile.TemporaryFile()
+            f.writelines(b'%s\t%020d\t%d\n' % city for city in run)
+            f.seek(0)
+            runs.append(f)
+
+        offsets = array('Q')
+        with open(index_filename + '.tmp', 'wb') as out:
+            out.write(HEADER.pack(MAGIC, 0, 0))
+            position = HEADER.size
+            # '\t' sorts before any character of a name, sorted lines are sorted (name, position)
+            name = last = None
+            for line in merge(*runs):
+                tab = line.index(b'\t')
+                if line[:tab] != name:
+                    if last is not None:
+                        offsets.append(position)
+                        out.write(last)
+                        position += len(last)
+                    name = line[:tab]
+                # drop the position, the index lines are 'name\tpopulation\n'
+                last = name + line[tab + 21:]
+            if last is not None:
+                offsets.append(position)
+                out.write(last)
+                position += len(last)
+            out.write(offsets.tobytes())
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, len(offsets), position))
+        os.replace(index_filename + '.tmp', index_filename)
+    finally:
+        for f in runs:
+            f.close()
+
+
+class CapitalsIndex(Mapping):
+    def __init__(self, index, cache_size=4096):
+        # index: the name of an index file or an index that is already mapped
+        if isinstance(index, mmap.mmap):
+            self.map = index
+        else:
+            with open(index, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, position = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f'{index} is not a capitals index')
+        self.offsets = memoryview(self.map)[position:position + 8 * self.count].cast('Q')
+        self.lookup = lru_cache(maxsize=cache_size)(self._search)
+
+    def _search(self, name):
+        key = name.encode()
+        data, offsets = self.map, self.offsets
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = offsets[middle]
+            tab = data.find(b'\t', start)
+            found = data[start:tab]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return int(data[tab + 1:data.find(b'\n', tab)])
+        return None
+
+    def get_many(self, names):
+        # name -> population (None when missing), the names are searched in sorted order and every
+        # search starts where the previous one stopped
+        data, offsets = self.map, self.offsets
+        result = {}
+        low = 0
+        for key in sorted(name.encode() for name in set(names)):
+            high = self.count
+            population = None
+            while low < high:
+                middle = (low + high) // 2
+                start = offsets[middle]
+                tab = data.find(b'\t', start)
+                found = data[start:tab]
+                if found < key:
+                    low = middle + 1
+                elif found > key:
+                    high = middle
+                else:
+                    population = int(data[tab + 1:data.find(b'\n', tab)])
+                    low = middle
+                    break
+            result[key.decode()] = population
+        return result
+
+    def __getitem__(self, name):
+        population = self.lookup(name)
+        if population is None:
+            raise KeyError(name)
+        return population
+
+    def get(self, name, default=None):
+        population = self.lookup(name)
+        return default if population is None else population
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        data = self.map
+        for start in self.offsets:
+            yield data[start:data.find(b'\t', start)].decode()
+
+    def close(self):
+        self.offsets.release()
+        self.map.close()
+
+
+class MmapDatabase(metaclass=ThreadSafeSingleton):
+    def __init__(self, capitals_filename='capitals.txt', index_filename=None, cache_size=4096):
+        index_filename = index_filename or capitals_filename + '.idx'
+        if not os.path.exists(index_filename) or \
+                os.path.getmtime(index_filename) < os.path.getmtime(capitals_filename):
+            build_index(capitals_filename, index_filename)
+        self.population = CapitalsIndex(index_filename, cache_size)
+
+    def get_population(self, name):
+        return self.population[name]
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+    import time
+
+    folder = tempfile.mkdtemp()
+    capitals = os.path.join(folder, 'capitals.txt')
+    with open('capitals.txt') as f, open(capitals, 'w') as out:
+        out.write(f.read())
+    db = MmapDatabase(capitals)
+    print(f'Seoul: {db.population["Seoul"]}, Atlantis: {db.population.get("Atlantis")}')
+    print(f'MmapDatabase() is db: {MmapDatabase() is db}')
+
+    # Benchmark: python capitals_mmap_db.py 10000000
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    big = os.path.join(folder, 'capitals_big.txt')
+    ids = list(range(n))
+    random.shuffle(ids)
+    with open(big, 'w') as out:
+        out.writelines(f'City {i}\n{i * 7 % 30_000_000}\n' for i in ids)
+    del ids
+
+    start = time.perf_counter()
+    build_index(big, big + '.idx')
+    print(f'{n} cities, index built once in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    index = CapitalsIndex(big + '.idx')
+    print(f'startup, mmap index:    {(time.perf_counter() - start) * 1000:.2f}ms')
+
+    start = time.perf_counter()
+    with open(big) as f:
+        lines = f.readlines()
+    population = {}
+    for i in range(0, len(lines), 2):
+        population[lines[i].strip()] = int(lines[i + 1].strip())
+    del lines
+    print(f'startup, readlines dict: {(time.perf_counter() - start) * 1000:.2f}ms')
+    del population
+
+    names = [f'City {random.randrange(n)}' for _ in range(100_000)]
+    start = time.perf_counter()
+    for name in names:
+        index[name]
+    cold = (time.perf_counter() - start) / len(names) * 1e6
+    hot_names = names[:1000] * 100
+    start = time.perf_counter()
+    for name in hot_names:
+        index[name]
+    hot = (time.perf_counter() - start) / len(hot_names) * 1e6
+    assert index[f'City {n // 2}'] == n // 2 * 7 % 30_000_000
+    print(f'lookup: {cold:.2f}us binary search, {hot:.2f}us from the LRU')
+    index.close()
+    db.population.close()
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    os.rmdir(folder)
@@ -0,0 +1,125 @@
+# Batched population queries
+# The record finders of singleton_testability.py go city by city: a Database() call (through the metaclass)
+# and a lookup for every city of the list, the same city as many times as it is referenced.
+# BatchRecordFinder takes the database once and the whole list of cities at once:
+#   - the references are counted (Counter), every distinct city is resolved once
+#   - the populations are resolved in one pass, with get_many when the database has it (the memory mapped
+#     index searches the sorted names in one sweep) or with population.get otherwise
+#   - the total is one sum of population * references, the cities that were not found come back with
+#     the number of times they were referenced instead of a KeyError in the middle of the job
+# It works with anything that has a population mapping: Database, DummyDatabase, MmapDatabase.
+
+from collections import Counter, namedtuple
+from operator import mul
+import os
+import random
+import sys
+import tempfile
+import time
+import unittest
+
+from capitals_mmap_db import CapitalsIndex, build_index
+from singleton_testability import ConfigurableRecordFinder, Database, DummyDatabase, SingletonRecordFinder
+
+PopulationTotal = namedtuple('PopulationTotal', 'total missing')
+
+
+class BatchRecordFinder:
+    def __init__(self, db=None):
+        self.db = db if db is not None else Database()
+
+    def resolve(self, cities):
+        population = self.db.population
+        get_many = getattr(population, 'get_many', None)
+        if get_many is not None:
+            return get_many(cities)
+        return dict(zip(cities, map(population.get, cities)))
+
+    def total_population(self, cities):
+        references = Counter(cities)
+        populations = self.resolve(references.keys())
+        missing = {city: count for city, count in references.items() if populations[city] is None}
+        found = [0 if populations[city] is None else populations[city] for city in references]
+        return PopulationTotal(sum(map(mul, found, references.values())), missing)
+
+
+class BatchRecordFinderTests(unittest.TestCase):
+    ddb = DummyDatabase()
+
+    def test_dummy_total_population(self):
+        finder = BatchRecordFinder(self.ddb)
+        self.assertEqual(finder.total_population(['alpha', 'beta', 'alpha']), (4, {}))
+
+    def test_missing_cities(self):
+        finder = BatchRecordFinder(self.ddb)
+        result = finder.total_population(['gamma', 'delta', 'delta', 'omega'])
+        self.assertEqual(result.total, 3)
+        self.assertEqual(result.missing, {'delta': 2, 'omega': 1})
+
+    def test_empty(self):
+        self.assertEqual(BatchRecordFinder(self.ddb).total_population([]), (0, {}))
+
+    def test_singleton_database(self):
+        finder = BatchRecordFinder()
+        self.assertIs(finder.db, Database())
+        self.assertEqual(finder.total_population(['Seoul', 'Mexico City', 'Seoul']).total,
+                         2 * 17500000 + 17400000)
+
+    def test_mmap_database(self):
+        with tempfile.TemporaryDirectory() as folder:
+            index_filename = os.path.join(folder, 'capitals.idx')
+            build_index('capitals.txt', index_filename)
+            index = CapitalsIndex(index_filename)
+
+            class IndexDatabase:
+                population = index
+
+            cities = ['Seoul', 'Tokyo', 'Atlantis', 'Seoul', 'New York']
+            expected = BatchRecordFinder(Database()).total_population(cities)
+            self.assertEqual(BatchRecordFinder(IndexDatabase()).total_population(cities), expected)
+            self.assertEqual(expected.missing, {'Atlantis': 1})
+            index.close()
+
+
+def timed(label, finder, cities, expected):
+    start = time.perf_counter()
+    result = finder.total_population(cities)
+    elapsed = time.perf_counter() - start
+    total = result if isinstance(result, int) else result.total
+    assert total == expected
+    print(f'  {label:<28} {elapsed:.3f}s')
+    return elapsed
+
+
+def benchmark(references, cities=100_000):
+    capitals = list(Database().population)
+    names = random.choices(capitals, k=references)
+    expected = sum(map(Database().population.__getitem__, names))
+    print(f'{references} references to the {len(capitals)} capitals:')
+    timed('SingletonRecordFinder', SingletonRecordFinder(), names, expected)
+    timed('ConfigurableRecordFinder', ConfigurableRecordFinder(Database()), names, expected)
+    timed('BatchRecordFinder', BatchRecordFinder(), names, expected)
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'capitals.txt')
+        with open(filename, 'w') as f:
+            f.writelines(f'City {i}\n{i}\n' for i in range(cities))
+        build_index(filename, filename + '.idx')
+
+        class IndexDatabase:
+            population = CapitalsIndex(filename + '.idx')
+
+        names = [f'City {random.randrange(cities)}' for _ in range(references)]
+        expected = sum(map(int, (name[5:] for name in names)))
+        print(f'{references} references to {cities} cities of a memory mapped index:')
+        timed('ConfigurableRecordFinder', ConfigurableRecordFinder(IndexDatabase()), names, expected)
+        timed('BatchRecordFinder', BatchRecordFinder(IndexDatabase()), names, expected)
+        IndexDatabase.population.close()
+
+
+if __name__ == '__main__':
+    # python singleton_batch_queries.py benchmark 5000000
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 5_000_000)
+    else:
+        unittest.main()
@@ -0,0 +1,205 @@
+# Monostate for many threads
+# Monostate shares one __dict__ between all the instances and nothing protects it: two threads doing
+# cfo.money_managed += 1 can lose one of the updates, and a reader cannot tell whether what it read before
+# is still current.
+# StripedMonostate keeps the shared attributes in a StripedState instead (one per class):
+#   - the instances still share one __dict__, reading an attribute is a plain attribute read, no lock
+#   - writes go through __setattr__ and take the lock of the stripe of the attribute (hash of the name),
+#     writes to attributes of different stripes do not wait for each other
+#   - every attribute has a version that goes up by one on every write
+#   - modify(name, function) is a read-modify-write under the stripe lock
+#   - snapshot() takes all the stripe locks (always in the same order) and copies the state at one instant
+# version(name) is cheap, a reader keeps the version it read and compares it later to know if it is stale,
+# get_versioned(name) returns the value together with its version (a version that may lag behind, unless
+# exact=True, which takes the stripe lock).
+# Every direct subclass of StripedMonostate has its own state, shared with its own subclasses.
+
+from threading import Lock, Thread
+import sys
+import time
+
+from singleton_monostate import Monostate
+
+
+class StripedState:
+    def __init__(self, stripes=16):
+        self.locks = [Lock() for _ in range(stripes)]
+        self.values = {}
+        self.versions = {}
+
+    def lock(self, name):
+        return self.locks[hash(name) % len(self.locks)]
+
+    def version(self, name):
+        return self.versions.get(name, 0)
+
+    def get_versioned(self, name, exact=False):
+        # (value, version), the version is read first: any number of writes can finish in between, so the
+        # version can lag behind the value (by several versions), never lead it. Comparing it later may report
+        # the value stale when it is not, never the other way round.
+        # exact=True reads both under the stripe lock, the version is then the one of the value
+        if exact:
+            with self.lock(name):
+                return self.values[name], self.versions[name]
+        version = self.versions.get(name, 0)
+        return self.values[name], version
+
+    def set(self, name, value):
+        with self.lock(name):
+            # the value goes in before the version, a reader can see a new value with the old version
+            # (and check again for nothing) but never an old value with the new version
+            self.values[name] = value
+            self.versions[name] = self.versions.get(name, 0) + 1
+
+    def modify(self, name, function):
+        with self.lock(name):
+            try:
+                value = self.values[name]
+            except KeyError:
+                raise AttributeError(name) from None
+            value = function(value)
+            self.values[name] = value
+            self.versions[name] += 1
+            return value
+
+    def delete(self, name):
+        with self.lock(name):
+            del self.values[name]
+            self.versions[name] += 1
+
+    def snapshot(self):
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            return {name: (value, self.versions[name]) for name, value in self.values.items()}
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+
+
+class StripedMonostate:
+    stripes = 16
+
+    def __init_subclass__(cls, **kwargs):
+        # a direct subclass (or one that sets stripes) starts its own state, its subclasses share it
+        super().__init_subclass__(**kwargs)
+        if 'stripes' in cls.__dict__ or not hasattr(cls, '_state'):
+            cls._state = StripedState(cls.stripes)
+
+    def __new__(cls, *args, **kwargs):
+        # reads go straight to the shared values, like in Monostate
+        obj = super().__new__(cls)
+        object.__setattr__(obj, '__dict__', cls._state.values)
+        return obj
+
+    def __setattr__(self, name, value):
+        type(self)._state.set(name, value)
+
+    def __delattr__(self, name):
+        try:
+            type(self)._state.delete(name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def version(self, name):
+        return type(self)._state.version(name)
+
+    def get_versioned(self, name, exact=False):
+        try:
+            return type(self)._state.get_versioned(name, exact)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def modify(self, name, function):
+        return type(self)._state.modify(name, function)
+
+    def snapshot(self, versions=False):
+        # the shared attributes at one instant, name -> value (or (value, version))
+        entries = type(self)._state.snapshot()
+        return entries if versions else {name: value for name, (value, _) in entries.items()}
+
+
+class CFO(StripedMonostate):
+    def __init__(self):
+        self.name = ''
+        self.money_managed = 0
+
+    def __str__(self):
+        return f'{self.name} money managed ${self.money_managed}'
+
+
+KEYS = [f'account_{i}' for i in range(64)]
+
+
+class Accounts(StripedMonostate):
+    pass
+
+
+class OneLockAccounts(StripedMonostate):
+    stripes = 1
+
+
+class UnsafeAccounts(Monostate):
+    _shared_state = {}
+
+    def modify(self, name, function):
+        value = function(getattr(self, name))
+        setattr(self, name, value)
+        return value
+
+
+def increment(value):
+    return value + 1
+
+
+def run(cls, threads, operations, write_every):
+    accounts = cls()
+    for key in KEYS:
+        setattr(accounts, key, 0)
+
+    def work(offset):
+        account = cls()
+        for i in range(operations):
+            key = KEYS[(i + offset) % len(KEYS)]
+            if i % write_every == 0:
+                account.modify(key, increment)
+            else:
+                getattr(account, key)
+
+    workers = [Thread(target=work, args=(t * 7,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    writes = threads * len(range(0, operations, write_every))
+    lost = writes - sum(getattr(accounts, key) for key in KEYS)
+    return threads * operations / elapsed, lost
+
+
+if __name__ == '__main__':
+    cfo1 = CFO()
+    cfo1.name = 'Sherly'
+    cfo1.money_managed = 1000000
+    seen = cfo1.version('money_managed')
+    cfo2 = CFO()
+    cfo2.name = 'Ruth'
+    cfo2.modify('money_managed', lambda money: money + 2000000)
+    print(cfo1)
+    print(cfo2)
+    print(f'money_managed was version {seen}, now {cfo1.version("money_managed")}: stale')
+    print(f'get_versioned: {cfo2.get_versioned("money_managed", exact=True)}')
+    print(cfo1.snapshot(versions=True))
+
+    # Benchmark: python singleton_monostate_striped.py <operations per thread>
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for label, write_every in (('read heavy (5% writes)', 20), ('write heavy (50% writes)', 2)):
+        print(label)
+        for threads in (1, 2, 4, 8, 16, 32):
+            results = []
+            for cls in (UnsafeAccounts, OneLockAccounts, Accounts):
+                throughput, lost = run(cls, threads, operations, write_every)
+                results.append(f'{throughput / 1e6:.2f}M ops/s' + (f' ({lost} lost)' if lost else ''))
+            print(f'  {threads:>2} threads: unsafe monostate {results[0]}, one lock {results[1]}, '
+                  f'16 stripes {results[2]}')
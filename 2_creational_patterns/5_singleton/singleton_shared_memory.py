@@ -0,0 +1,196 @@
+# Singleton shared between processes
+# All the singletons of this folder live in one process: with 16 workers there are 16 Databases, each one
+# loaded from the file and taking its own memory.
+# SharedDatabase keeps the capitals in shared memory (multiprocessing.shared_memory), in the format of the
+# sorted index of capitals_mmap_db.py, so it can be searched where it is:
+#   - the first process to create the control block '<name>' loads the capitals and publishes them,
+#     the others find the block already there and attach to the published data, read only, nothing copied
+#   - the control block holds the version of the data, the data itself is the block '<name>_<version>'
+#   - reload() (only the process that created it) publishes a new block and then bumps the version, readers
+#     compare the version on every access and map the new block when it changed; the old block is
+#     unlinked, whoever still holds the old population keeps reading the old data until it lets it go
+# Readers map the blocks themselves from /dev/shm (POSIX shared memory on Linux) with a read only mmap, so
+# they never register them with the resource tracker, which would unlink them when the reader exits.
+# The creator has to close() the database when it is done, that unlinks the blocks.
+
+from multiprocessing import shared_memory
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from capitals_mmap_db import CapitalsIndex, build_index
+from singleton_thread_safe import ThreadSafeSingleton
+
+CONTROL = struct.Struct('<Q')
+
+
+def map_block(name, size=1, timeout=0):
+    # SharedMemory(create=True) creates the file before it sets its size: wait (up to timeout seconds) until
+    # the block has at least size bytes
+    deadline = time.monotonic() + timeout
+    while True:
+        with open(f'/dev/shm/{name}', 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= size:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'{name} still has less than {size} bytes after {timeout}s')
+        time.sleep(0.001)
+
+
+class SharedDatabase(metaclass=ThreadSafeSingleton):
+    def __init__(self, capitals_filename='capitals.txt', name='capitals_db', timeout=30):
+        self.capitals_filename = capitals_filename
+        self.name = name
+        self.blocks = {}
+        try:
+            self.control_block = shared_memory.SharedMemory(name, create=True, size=CONTROL.size)
+        except FileExistsError:
+            self.control_block = None
+        self.owner = self.control_block is not None
+        if self.owner:
+            CONTROL.pack_into(self.control_block.buf, 0, 0)
+            try:
+                self.publish()
+            except BaseException:
+                # nobody else could ever publish in a control block left at version 0
+                self.control_block.close()
+                self.control_block.unlink()
+                raise
+        deadline = time.monotonic() + timeout
+        self.control = map_block(name, CONTROL.size, timeout)
+
+        # wait for the creator to publish the first version
+        while self.version() == 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'nothing was published in {name} after {timeout}s')
+            time.sleep(0.01)
+        self.index = None
+        self.index_version = 0
+
+    def version(self):
+        return CONTROL.unpack_from(self.control)[0]
+
+    @property
+    def population(self):
+        version = self.version()
+        if version != self.index_version:
+            self.attach(version)
+        return self.index
+
+    def attach(self, version):
+        while True:
+            try:
+                index = CapitalsIndex(map_block(f'{self.name}_{version}'))
+                break
+            except FileNotFoundError:
+                # reloaded again in the meantime, that block is gone
+                version = self.version()
+        # the previous index is not closed, callers may still hold it: it is unmapped when it is collected
+        self.index, self.index_version = index, version
+
+    def get_population(self, name):
+        return self.population[name]
+
+    def publish(self):
+        version = CONTROL.unpack_from(self.control_block.buf)[0] + 1
+        with tempfile.TemporaryDirectory() as folder:
+            index_filename = os.path.join(folder, 'capitals.idx')
+            build_index(self.capitals_filename, index_filename)
+            size = os.path.getsize(index_filename)
+            block = shared_memory.SharedMemory(f'{self.name}_{version}', create=True, size=size)
+            with open(index_filename, 'rb') as f:
+                f.readinto(block.buf[:size])
+        # the data is all there before anybody can see the new version
+        CONTROL.pack_into(self.control_block.buf, 0, version)
+        for old in self.blocks.values():
+            old.close()
+            old.unlink()
+        self.blocks = {version: block}
+
+    def reload(self):
+        if not self.owner:
+            raise RuntimeError(f'only the process that created {self.name} can reload it')
+        self.publish()
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        self.control.close()
+        if self.owner:
+            for block in self.blocks.values():
+                block.close()
+                block.unlink()
+            self.control_block.close()
+            self.control_block.unlink()
+
+
+def rss_and_pss():
+    # kB of resident memory, and of the proportional share (shared pages divided among their users)
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def worker(kind, folder, names, results):
+    start = time.perf_counter()
+    if kind == 'per process':
+        os.chdir(folder)
+        from singleton_testability import Database
+        population = Database().population
+    else:
+        population = SharedDatabase(os.path.join(folder, 'capitals.txt')).population
+    startup = time.perf_counter() - start
+    total = sum(population[name] for name in names)
+    results.put((startup, total) + rss_and_pss())
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import random
+    import shutil
+    import sys
+
+    # Benchmark: python singleton_shared_memory.py <cities> <workers>
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    folder = tempfile.mkdtemp()
+    capitals = os.path.join(folder, 'capitals.txt')
+    shutil.copy('capitals.txt', capitals)
+    with open(capitals, 'a') as f:
+        f.writelines(f'City {i}\n{i}\n' for i in range(n))
+    names = [f'City {random.randrange(n)}' for _ in range(10_000)]
+
+    start = time.perf_counter()
+    db = SharedDatabase(capitals)
+    print(f'{n} cities published in shared memory in {time.perf_counter() - start:.1f}s')
+    print(f'Seoul: {db.population["Seoul"]}, version {db.version()}, '
+          f'SharedDatabase() is db: {SharedDatabase() is db}')
+    db.reload()
+    print(f'Seoul: {db.population["Seoul"]}, version {db.version()} after reload')
+
+    context = multiprocessing.get_context('spawn')
+    for kind in ('per process', 'shared memory'):
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(kind, folder, names, results))
+                     for _ in range(workers)]
+        for p in processes:
+            p.start()
+        measures = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+        assert len({total for _, total, _, _ in measures}) == 1
+        startup = sum(m[0] for m in measures) / workers
+        rss = sum(m[2] for m in measures) / workers / 1024
+        pss = sum(m[3] for m in measures) / workers / 1024
+        print(f'{workers} workers, {kind:<13}: startup {startup * 1000:.1f}ms, '
+              f'RSS {rss:.0f}MB, PSS {pss:.0f}MB per worker')
+
+    db.close()
+    shutil.rmtree(folder)
@@ -0,0 +1,100 @@
+# Thread safe singleton metaclass
+# In singleton_metaclass.py two threads can both see that there is no instance yet and both run __init__,
+# and every Database() afterwards still goes through the dict of instances.
+# ThreadSafeSingleton gives every class its own lock and creates the instance with double-checked locking:
+# a look at the class without the lock, then again with the lock held before calling __init__.
+# Once the instance exists the class is switched to the BuiltSingleton metaclass, whose __call__ only
+# returns the instance stored on the class: no lock, no dict lookup by class.
+# If __init__ raises nothing is stored and the next call tries again.
+
+from threading import Barrier, Lock, Thread
+import sys
+import time
+
+from singleton_metaclass import Singleton
+
+
+class ThreadSafeSingleton(type):
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        # a subclass of a built singleton inherits its metaclass, it has to be built on its own
+        if type(cls) is BuiltSingleton:
+            cls.__class__ = ThreadSafeSingleton
+        cls._singleton_lock = Lock()
+
+    def __call__(cls, *args, **kwargs):
+        instance = cls.__dict__.get('_singleton_instance')
+        if instance is None:
+            with cls._singleton_lock:
+                instance = cls.__dict__.get('_singleton_instance')
+                if instance is None:
+                    instance = super().__call__(*args, **kwargs)
+                    cls._singleton_instance = instance
+                    cls.__class__ = BuiltSingleton
+        return instance
+
+
+class BuiltSingleton(ThreadSafeSingleton):
+    def __call__(cls, *args, **kwargs):
+        return cls._singleton_instance
+
+
+class Database(metaclass=ThreadSafeSingleton):
+    constructions = 0
+
+    def __init__(self):
+        print('Loading Database')
+        # loading takes a while, plenty of time for other threads to come in
+        time.sleep(0.05)
+        type(self).constructions += 1
+
+
+class RacyDatabase(metaclass=Singleton):
+    constructions = 0
+
+    def __init__(self):
+        time.sleep(0.05)
+        type(self).constructions += 1
+
+
+def hit_at_once(cls, threads):
+    barrier = Barrier(threads)
+    instances = []
+
+    def work():
+        barrier.wait()
+        instances.append(cls())
+
+    workers = [Thread(target=work) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len({id(i) for i in instances})
+
+
+def per_call(cls, n):
+    cls()
+    start = time.perf_counter()
+    for _ in range(n):
+        cls()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+if __name__ == '__main__':
+    # Benchmark: python singleton_thread_safe.py <threads> <calls>
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    for cls in (RacyDatabase, Database):
+        distinct = hit_at_once(cls, threads)
+        print(f'{cls.__name__:<12} {threads} threads at once: {cls.constructions} constructions, '
+              f'{distinct} distinct instances')
+    print(f'Database() is Database(): {Database() is Database()}, metaclass now {type(Database).__name__}')
+
+    class Plain:
+        pass
+
+    print(f'per call: plain class {per_call(Plain, n):.0f}ns, '
+          f'dict metaclass {per_call(RacyDatabase, n):.0f}ns, '
+          f'thread safe metaclass {per_call(Database, n):.0f}ns')